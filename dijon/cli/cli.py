@@ -1,6 +1,8 @@
 import logging
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 import alembic.config
@@ -8,7 +10,8 @@ import click
 import uvicorn
 
 from dijon import crud, database, snapshot
-from dijon.snapshot.create import update_meetings_last_changed
+from dijon.snapshot import compact, delete, export
+from dijon.snapshot.create import replace_meeting_events, update_meetings_last_changed
 
 
 @click.group()
@@ -50,16 +53,152 @@ def populate_meeting_last_changed():
         for root_server in crud.get_root_servers(db):
             snapshots = crud.get_snapshots(db, root_server.id)
             for snap in snapshots:
+                if snap.alias_of_id:
+                    continue
                 print(f"root_server    {root_server.id}    snapshot    {snap.id}")
                 prev_snapshot = crud.get_previous_snapshot(db, snap.id)
                 if prev_snapshot:
                     update_meetings_last_changed(db, snap, prev_snapshot)
+                    # exports include last_changed, so they are removed until it is committed and
+                    # then rewritten, and running api processes' cached responses are made stale
+                    export.delete_exports(snap.id)
+                    crud.increment_data_version(db, [root_server.id])
                     db.commit()
+                    export.write_exports(db, snap)
 
 
 @cli.command()
 @click.option("--root-server-id", default=0, show_default=False)
-def run_snapshot(root_server_id: int):
+@click.option("--force", is_flag=True, default=False, help="Recompute events for snapshots that already have them")
+def backfill_meeting_events(root_server_id: int, force: bool):
+    logging.basicConfig(level=logging.INFO)
+    with database.db_context() as db:
+        if root_server_id:
+            root_server = crud.get_root_server(db, root_server_id)
+            if not root_server:
+                print(f"Error: root_server with id {root_server_id} does not exist")
+                sys.exit(1)
+            root_servers = [root_server]
+        else:
+            root_servers = crud.get_root_servers(db)
+
+        for root_server in root_servers:
+            for snap in crud.get_snapshots(db, root_server.id):
+                if snap.prev_snapshot_id and not force:
+                    continue
+                prev_snapshot = crud.get_previous_snapshot(db, snap.id)
+                if not prev_snapshot:
+                    continue
+                events = replace_meeting_events(db, snap, prev_snapshot)
+                db.commit()
+                print(f"root_server    {root_server.id}    snapshot    {snap.id}    events    {len(events)}")
+
+
+@cli.command()
+@click.option("--root-server-id", default=0, show_default=False)
+@click.option("--force", is_flag=True, default=False, help="Rewrite exports that already exist")
+def write_snapshot_exports(root_server_id: int, force: bool):
+    logging.basicConfig(level=logging.INFO)
+    if not export.get_export_dir():
+        print("Error: EXPORT_DIR is not set")
+        sys.exit(1)
+    with database.db_context() as db:
+        if root_server_id:
+            root_server = crud.get_root_server(db, root_server_id)
+            if not root_server:
+                print(f"Error: root_server with id {root_server_id} does not exist")
+                sys.exit(1)
+            root_servers = [root_server]
+        else:
+            root_servers = crud.get_root_servers(db)
+
+        for root_server in root_servers:
+            for snap in crud.get_snapshots(db, root_server.id):
+                if snap.alias_of_id:
+                    continue
+                if not force and os.path.exists(export.get_export_path(snap.id, export.MEETINGS, gzipped=True)):
+                    continue
+                export.write_exports(db, snap)
+                print(f"root_server    {root_server.id}    snapshot    {snap.id}")
+
+
+@cli.command()
+@click.option("--root-server-id", default=0, show_default=False, help="Delete this root server [default: those marked for deletion]")
+@click.option("--batch-size", default=None, type=int, help="Rows deleted per transaction [default: 1000]")
+def delete_root_server(root_server_id: int, batch_size: int):
+    logging.basicConfig(level=logging.INFO)
+    with database.db_context() as db:
+        if root_server_id:
+            root_server = crud.get_root_server(db, root_server_id, include_marked=True)
+            if not root_server:
+                print(f"Error: root_server with id {root_server_id} does not exist")
+                sys.exit(1)
+            root_servers = [root_server]
+        else:
+            root_servers = crud.get_root_servers_marked_for_deletion(db)
+
+        for root_server in root_servers:
+            print(f"root_server    {root_server.id}")
+            counts = delete.delete_root_server(db, root_server, batch_size=batch_size, commit=True, progress=_print_progress)
+            for table, num_rows in sorted(counts.items()):
+                print(f"total    {table}    {num_rows} rows")
+
+
+def _print_progress(table: str, num_rows: int):
+    print(f"deleted    {table}    {num_rows} rows")
+
+
+@cli.command()
+@click.option("--root-server-id", default=0, show_default=False)
+@click.option("--daily-days", default=None, type=int, help="Keep a snapshot per day for this many days [default: 90]")
+@click.option("--weekly-days", default=None, type=int, help="Keep a snapshot per week until this many days ago, then one per month [default: 365]")
+@click.option("--batch-size", default=None, type=int, help="Rows deleted per transaction [default: 1000]")
+@click.option("--dry-run", is_flag=True, default=False, help="Only report how many snapshots would be deleted")
+@click.option("--optimize", is_flag=True, default=False, help="Rebuild the tables afterwards to return the freed space to the filesystem")
+def compact_snapshots(root_server_id: int, daily_days: int, weekly_days: int, batch_size: int, dry_run: bool, optimize: bool):
+    logging.basicConfig(level=logging.INFO)
+    with database.db_context() as db:
+        if root_server_id:
+            root_server = crud.get_root_server(db, root_server_id)
+            if not root_server:
+                print(f"Error: root_server with id {root_server_id} does not exist")
+                sys.exit(1)
+            root_servers = [root_server]
+        else:
+            root_servers = crud.get_root_servers(db)
+
+        total_counts = {}
+        today = datetime.utcnow().date()
+        for root_server in root_servers:
+            counts = compact.compact_snapshots(
+                db, root_server, today, daily_days=daily_days, weekly_days=weekly_days, batch_size=batch_size, commit=True, dry_run=dry_run,
+            )
+            print(f"root_server    {root_server.id}    snapshots    {counts.get('snapshots', 0)}")
+            for table, num_rows in counts.items():
+                total_counts[table] = total_counts.get(table, 0) + num_rows
+
+        verb = "would delete" if dry_run else "deleted"
+        for table, num_rows in sorted(total_counts.items()):
+            print(f"{verb}    {table}    {num_rows} rows")
+        reclaimed_bytes = compact.get_reclaimed_bytes(db, total_counts)
+        if reclaimed_bytes is not None and not dry_run:
+            print(f"reclaimed    ~{reclaimed_bytes / 1024 / 1024:.1f}MB")
+        if optimize and not dry_run:
+            for table in crud.optimize_tables(db, sorted(t for t, num_rows in total_counts.items() if num_rows)):
+                print(f"optimized    {table}")
+
+
+@cli.command()
+@click.option("--root-server-id", default=0, show_default=False)
+@click.option(
+    "--concurrency",
+    default=1,
+    show_default=True,
+    type=click.IntRange(1),
+    help="Number of root servers to snapshot at once. Each uses its own db connection, so values above the "
+    "engine's pool size plus overflow (5 + 10) wait for a connection",
+)
+def run_snapshot(root_server_id: int, concurrency: int):
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger('dijon.cli.run_snapshot')
     with database.db_context() as db:
@@ -72,24 +211,56 @@ def run_snapshot(root_server_id: int):
         else:
             root_servers = crud.get_root_servers(db)
 
+        root_server_ids = []
         for root_server in root_servers:
             if not root_server.is_enabled:
-                logging.info(f"skipping disabled root server {root_server.id}:{root_server.url}")
+                logger.info(f"skipping disabled root server {root_server.id}:{root_server.url}")
                 continue
+            root_server_ids.append(root_server.id)
+
+    # each root server gets its own session and transaction, so a slow or failing
+    # server does not hold up or roll back any of the others
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(_run_root_server_snapshot, rs_id): rs_id for rs_id in root_server_ids}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    for rs_id in root_server_ids:
+        status, elapsed = results[rs_id]
+        logger.info(f"root_server {rs_id}: {status} in {elapsed:.1f}s")
+
+
+def _run_root_server_snapshot(root_server_id: int) -> tuple[str, float]:
+    logger = logging.getLogger('dijon.cli.run_snapshot')
+    start = time.monotonic()
+    try:
+        with database.db_context() as db:
+            root_server = crud.get_root_server(db, root_server_id)
+            if not root_server:
+                logger.error(f"root server {root_server_id} no longer exists")
+                return "failed", time.monotonic() - start
 
             snap = crud.get_snapshot_by_date(db, root_server.id, datetime.utcnow().date())
             if snap is not None:
                 logger.info(f"skipping snapshot for {root_server.id}:{root_server.url}")
-                continue
+                return "skipped", time.monotonic() - start
 
+            snap = snapshot.create(db, root_server)
+            db.commit()
             try:
-                snapshot.create(db, root_server)
+                export.write_exports(db, snap)
             except Exception:
-                # TODO report this somewhere
-                logger.exception(f"error creating snapshot for {root_server.id}:{root_server.url}")
-                db.rollback()
-            else:
-                db.commit()
+                # the snapshot is saved either way, and is read from the database until
+                # write-snapshot-exports writes its exports
+                logger.exception(f"error writing exports for root server {root_server_id}")
+    except Exception:
+        # TODO report this somewhere
+        # anything failing here, the commit included, fails only this root server, whose
+        # transaction db_context has rolled back
+        logger.exception(f"error creating snapshot for root server {root_server_id}")
+        return "failed", time.monotonic() - start
+    return "created", time.monotonic() - start
 
 
 if __name__ == "__main__":
@@ -1,14 +1,15 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
-from dijon.crud import create_default_admin_user
+from dijon.crud import create_default_admin_user, refresh_snapshot_dates_after_flush
 from dijon.database import Base
 from dijon.dependencies import get_db
 from dijon.main import app
 from dijon.settings import settings
+from dijon.utils.cache_util import response_cache
 from dijon.utils.token_util import create_access_token
 
 
@@ -54,7 +55,9 @@ def admin_access_token(engine):
 
 @pytest.fixture
 def db(engine):
-    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session_maker = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    event.listen(session_maker, "after_flush", refresh_snapshot_dates_after_flush)
+    session = session_maker()
     try:
         yield session
     finally:
@@ -65,6 +68,8 @@ def db(engine):
 @pytest.fixture
 def ctx(db: Session):
     client = TestClient(app)
+    # ids are reused once a test's transaction is rolled back, so cached responses can't be
+    response_cache.clear()
     try:
         app.dependency_overrides[get_db] = lambda: (yield db)
         yield Ctx(db, client)
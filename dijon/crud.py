@@ -1,20 +1,42 @@
 from datetime import date, datetime, timedelta
-from typing import Optional
-
-from sqlalchemy import desc
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import (
+    Date,
+    LargeBinary,
+    String,
+    cast,
+    delete,
+    desc,
+    distinct,
+    exists,
+    func,
+    inspect,
+    or_,
+    select,
+    text,
+    type_coerce,
+    union,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import Connection
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, subqueryload
+from sqlalchemy.orm import Session, aliased, selectinload, subqueryload
 
 from dijon.models import (
+    CacheVersion,
     Format,
     FormatNawsCode,
     Meeting,
+    MeetingEvent,
     MeetingFormat,
     MeetingNawsCode,
     RootServer,
+    RootServerDeletion,
     ServiceBody,
     ServiceBodyNawsCode,
     Snapshot,
+    SnapshotDate,
     Token,
     User,
 )
@@ -53,17 +75,76 @@ def update_root_server(
         update["url"] = url
     if is_enabled is not None:
         update["is_enabled"] = is_enabled
-    num_rows = db.query(RootServer).filter(RootServer.id == root_server_id).update(update)
+    query = db.query(RootServer).filter(RootServer.id == root_server_id, _not_marked_for_deletion(RootServer.id))
+    num_rows = query.update(update, synchronize_session="fetch")
     db.flush()
     return num_rows != 0
 
 
-def get_root_server(db: Session, root_server_id: int) -> Optional[RootServer]:
-    return db.query(RootServer).filter(RootServer.id == root_server_id).first()
+def get_root_server(db: Session, root_server_id: int, include_marked: bool = False) -> Optional[RootServer]:
+    query = db.query(RootServer).filter(RootServer.id == root_server_id)
+    if not include_marked:
+        query = query.filter(_not_marked_for_deletion(RootServer.id))
+    return query.first()
 
 
 def get_root_servers(db: Session) -> list[RootServer]:
-    return db.query(RootServer).all()
+    return db.query(RootServer).filter(_not_marked_for_deletion(RootServer.id)).all()
+
+
+def mark_root_server_for_deletion(db: Session, root_server_id: int) -> bool:
+    # hides the root server until delete-root-server deletes it, returning False if it doesn't
+    # exist or is already marked
+    if not get_root_server(db, root_server_id):
+        return False
+    db.add(RootServerDeletion(root_server_id=root_server_id))
+    db.flush()
+    return True
+
+
+def get_root_servers_marked_for_deletion(db: Session) -> list[RootServer]:
+    query = db.query(RootServer).join(RootServerDeletion, RootServerDeletion.root_server_id == RootServer.id)
+    return query.order_by(RootServerDeletion.created_at, RootServer.id).all()
+
+
+def _not_marked_for_deletion(root_server_id_column):
+    return ~exists().where(RootServerDeletion.root_server_id == root_server_id_column)
+
+
+# cache versions
+#
+#
+def get_cache_versions(db: Session, root_server_id: int) -> tuple[int, int]:
+    # the root server's (naws_codes_version, data_version), read with a plain select so that it is
+    # never stale within a session
+    query = select(CacheVersion.naws_codes_version, CacheVersion.data_version).where(CacheVersion.root_server_id == root_server_id)
+    row = db.execute(query).first()
+    return tuple(row) if row else (0, 0)
+
+
+def increment_naws_codes_version(db: Session, root_server_ids: list[int]):
+    # called whenever a root server's naws codes change, so anything derived from them can
+    # tell it is out of date
+    _increment_cache_version(db, root_server_ids, CacheVersion.naws_codes_version)
+
+
+def increment_data_version(db: Session, root_server_ids: list[int]):
+    # called whenever a root server's existing snapshot data is rewritten
+    _increment_cache_version(db, root_server_ids, CacheVersion.data_version)
+
+
+def _increment_cache_version(db: Session, root_server_ids: list[int], column):
+    if not root_server_ids:
+        return
+    db.flush()
+    rows = [{"root_server_id": root_server_id, column.key: 1} for root_server_id in sorted(set(root_server_ids))]
+    _upsert(db.connection(), CacheVersion.__table__, rows, {column.key: column + 1})
+
+
+def _upsert(conn: Connection, table, rows: list[dict], update: dict):
+    # inserts rows, applying update instead to any that already exist, in a single statement so
+    # that concurrent transactions can't both try to insert the same primary key
+    conn.execute(mysql_insert(table).values(rows).on_duplicate_key_update(update))
 
 
 # snapshots
@@ -82,12 +163,9 @@ def get_snapshot_by_id(db: Session, snapshot_id: int) -> Optional[Snapshot]:
 
 
 def get_snapshot_by_date(db: Session, root_server_id: int, date: date) -> Optional[Snapshot]:
-    dt = datetime.fromordinal(date.toordinal())
-    query = db.query(Snapshot)
-    query = query.filter(Snapshot.root_server_id == root_server_id)
-    query = query.filter(Snapshot.created_at >= dt, Snapshot.created_at < dt + timedelta(days=1))
-    query = query.order_by(desc(Snapshot.created_at))
-    return query.first()
+    query = db.query(Snapshot).join(SnapshotDate, SnapshotDate.snapshot_id == Snapshot.id)
+    query = query.filter(SnapshotDate.root_server_id == root_server_id, SnapshotDate.snapshot_date == date)
+    return query.filter(_not_marked_for_deletion(SnapshotDate.root_server_id)).first()
 
 
 def get_previous_snapshot(db: Session, snapshot_id: Snapshot) -> Optional[Snapshot]:
@@ -101,6 +179,13 @@ def get_previous_snapshot(db: Session, snapshot_id: Snapshot) -> Optional[Snapsh
     return query.first()
 
 
+def get_snapshots_between(db: Session, root_server_id: int, start: datetime, end: datetime) -> list[Snapshot]:
+    query = db.query(Snapshot)
+    query = query.filter(Snapshot.root_server_id == root_server_id)
+    query = query.filter(Snapshot.created_at > start, Snapshot.created_at <= end)
+    return query.order_by(Snapshot.created_at).all()
+
+
 def get_snapshots(db: Session, root_server_id: int = None) -> list[Snapshot]:
     query = db.query(Snapshot)
     if root_server_id is not None:
@@ -108,6 +193,99 @@ def get_snapshots(db: Session, root_server_id: int = None) -> list[Snapshot]:
     return query.order_by(Snapshot.root_server_id, Snapshot.created_at).all()
 
 
+def get_table_avg_row_lengths(db: Session) -> dict[str, int]:
+    # the average bytes per row of each table, data and indexes together, as estimated by mysql
+    if db.get_bind().dialect.name != "mysql":
+        return {}
+    query = text(
+        "SELECT TABLE_NAME, (DATA_LENGTH + INDEX_LENGTH) DIV NULLIF(TABLE_ROWS, 0) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    return {table: int(length or 0) for table, length in db.execute(query)}
+
+
+def optimize_tables(db: Session, table_names: list[str]) -> list[str]:
+    # rebuilds the tables so that the space innodb keeps for reuse after rows are deleted goes back
+    # to the filesystem, returning the names of the tables rebuilt. The rebuilds are online, but
+    # each one commits the session's transaction.
+    if db.get_bind().dialect.name != "mysql":
+        return []
+    for table_name in table_names:
+        db.execute(text(f"OPTIMIZE TABLE {table_name}")).all()
+    return table_names
+
+
+# snapshot dates
+#
+#
+def get_snapshot_dates(db: Session, root_server_id: int = None) -> list[SnapshotDate]:
+    query = db.query(SnapshotDate).filter(_not_marked_for_deletion(SnapshotDate.root_server_id))
+    if root_server_id is not None:
+        query = query.filter(SnapshotDate.root_server_id == root_server_id)
+    return query.order_by(SnapshotDate.root_server_id, SnapshotDate.snapshot_date).all()
+
+
+def refresh_snapshot_dates(conn: Connection, keys: Iterable[tuple[int, date]], exclude_snapshot_ids: Iterable[int] = ()):
+    # points each (root_server_id, date) at that root server's latest snapshot on that date, or
+    # removes it if there isn't one. This takes a connection rather than a session so that it
+    # can run from inside a flush.
+    table = SnapshotDate.__table__
+    snapshots = Snapshot.__table__
+    exclude_snapshot_ids = list(exclude_snapshot_ids)
+    for root_server_id, snapshot_date in keys:
+        dt = datetime.fromordinal(snapshot_date.toordinal())
+        query = select(snapshots.c.id).where(snapshots.c.root_server_id == root_server_id)
+        query = query.where(snapshots.c.created_at >= dt, snapshots.c.created_at < dt + timedelta(days=1))
+        if exclude_snapshot_ids:
+            query = query.where(snapshots.c.id.not_in(exclude_snapshot_ids))
+        snapshot_id = conn.execute(query.order_by(desc(snapshots.c.created_at), desc(snapshots.c.id)).limit(1)).scalar()
+        if snapshot_id is None:
+            conn.execute(delete(table).where(table.c.root_server_id == root_server_id, table.c.snapshot_date == snapshot_date))
+        else:
+            row = {"root_server_id": root_server_id, "snapshot_date": snapshot_date, "snapshot_id": snapshot_id}
+            _upsert(conn, table, [row], {"snapshot_id": snapshot_id})
+
+
+def unlink_snapshot(db: Session, snapshot: Snapshot):
+    # Takes the snapshot out of the snapshot dates, pointing its date at the previous snapshot
+    # of that day if there is one, and invalidates the root server's cached responses, so that
+    # nothing can read the snapshot while its rows are deleted.
+    db.flush()
+    refresh_snapshot_dates(db.connection(), [(snapshot.root_server_id, snapshot.created_at.date())], exclude_snapshot_ids=[snapshot.id])
+    increment_data_version(db, [snapshot.root_server_id])
+
+
+def refresh_snapshot_dates_after_flush(session: Session, flush_context):
+    # Snapshot dates depend on created_at, which is set by the database when a snapshot is
+    # inserted, so the dates of new and redated snapshots are read back after they're flushed.
+    # This is an after_flush listener of the app's sessions, see dijon.database, and of any
+    # other sessionmaker it is registered on.
+    keys = set()
+    snapshot_ids = []
+    for obj in session.new:
+        if isinstance(obj, Snapshot):
+            snapshot_ids.append(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Snapshot):
+            history = inspect(obj).attrs.created_at.history
+            if history.has_changes():
+                keys.update((obj.root_server_id, value.date()) for value in history.deleted if value)
+                snapshot_ids.append(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Snapshot):
+            created_at = inspect(obj).dict.get("created_at")
+            if created_at:
+                keys.add((obj.root_server_id, created_at.date()))
+    if not keys and not snapshot_ids:
+        return
+
+    conn = session.connection()
+    if snapshot_ids:
+        snapshots = Snapshot.__table__
+        query = select(snapshots.c.root_server_id, type_coerce(func.date(snapshots.c.created_at), Date))
+        keys.update(tuple(row) for row in conn.execute(query.where(snapshots.c.id.in_(snapshot_ids))))
+    refresh_snapshot_dates(conn, keys)
+
+
 # service bodies
 #
 #
@@ -145,15 +323,55 @@ def get_service_bodies_for_snapshot(db: Session, snapshot_id: int) -> list[Servi
 
 
 def get_child_service_body_bmlt_ids(db: Session, snapshot_id: int, parent_bmlt_ids: list[int]) -> list[int]:
+    # The parent_bmlt_ids followed by the bmlt_ids of all of their descendants. The descendants
+    # are found with a recursive CTE where the database supports one, or else by walking the
+    # snapshot's service body tree in memory. Either way a cycle in the tree is only walked once.
+    if _supports_recursive_cte(db):
+        descendant_bmlt_ids = _get_descendant_service_body_bmlt_ids_cte(db, snapshot_id, parent_bmlt_ids)
+    else:
+        descendant_bmlt_ids = _get_descendant_service_body_bmlt_ids_in_memory(db, snapshot_id, parent_bmlt_ids)
     ret = list(parent_bmlt_ids)
-    all_service_bodies = get_service_bodies_for_snapshot(db, snapshot_id)
-    children = [sb for sb in all_service_bodies if sb.bmlt_id in parent_bmlt_ids]
-    while children:
-        children = [sb for sb in all_service_bodies if sb.parent in children and sb.bmlt_id not in ret]
-        ret.extend([c.bmlt_id for c in children])
+    seen = set(ret)
+    for bmlt_id in sorted(descendant_bmlt_ids):
+        if bmlt_id not in seen:
+            seen.add(bmlt_id)
+            ret.append(bmlt_id)
     return ret
 
 
+def _supports_recursive_cte(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    min_version = (10, 2) if dialect.is_mariadb else (8, 0)
+    return tuple(dialect.server_version_info or ()) >= min_version
+
+
+def _get_descendant_service_body_bmlt_ids_cte(db: Session, snapshot_id: int, parent_bmlt_ids: list[int]) -> set[int]:
+    query = select(ServiceBody.id, ServiceBody.bmlt_id)
+    query = query.where(ServiceBody.snapshot_id == snapshot_id, ServiceBody.bmlt_id.in_(parent_bmlt_ids))
+    descendants = query.cte("descendants", recursive=True)
+    child = aliased(ServiceBody)
+    query = select(child.id, child.bmlt_id).join(descendants, child.parent_id == descendants.c.id)
+    # union rather than union all, so rows already found aren't added again and cycles end
+    descendants = descendants.union(query.where(child.snapshot_id == snapshot_id))
+    return set(db.execute(select(descendants.c.bmlt_id)).scalars())
+
+
+def _get_descendant_service_body_bmlt_ids_in_memory(db: Session, snapshot_id: int, parent_bmlt_ids: list[int]) -> set[int]:
+    rows = db.query(ServiceBody.id, ServiceBody.parent_id, ServiceBody.bmlt_id).filter(ServiceBody.snapshot_id == snapshot_id).all()
+    children_by_parent_id = {}
+    for row in rows:
+        children_by_parent_id.setdefault(row.parent_id, []).append(row)
+    parent_bmlt_ids = set(parent_bmlt_ids)
+    stack = [row for row in rows if row.bmlt_id in parent_bmlt_ids]
+    seen_ids = {row.id for row in stack}
+    while stack:
+        for child in children_by_parent_id.get(stack.pop().id, []):
+            if child.id not in seen_ids:
+                seen_ids.add(child.id)
+                stack.append(child)
+    return {row.bmlt_id for row in rows if row.id in seen_ids}
+
+
 def get_service_body_naws_codes(db: Session, root_server_id: int = None) -> list[ServiceBodyNawsCode]:
     query = db.query(ServiceBodyNawsCode)
     if root_server_id is not None:
@@ -174,19 +392,24 @@ def create_service_body_naws_code(db: Session, root_server_id: int, bmlt_id: int
         db.flush()
     except IntegrityError:
         return None
+    increment_naws_codes_version(db, [root_server_id])
     db.refresh(naws_code)
     return naws_code
 
 
 def delete_service_body_naws_code(db: Session, id: int) -> bool:
+    root_server_ids = [root_server_id for root_server_id, in db.query(ServiceBodyNawsCode.root_server_id).filter(ServiceBodyNawsCode.id == id)]
     num_rows = db.query(ServiceBodyNawsCode).filter(ServiceBodyNawsCode.id == id).delete()
     db.flush()
+    increment_naws_codes_version(db, root_server_ids)
     return num_rows != 0
 
 
 def delete_service_body_naws_code_by_bmlt_id(db: Session, root_server_id: int, bmlt_id: int) -> bool:
     num_rows = db.query(ServiceBodyNawsCode).filter(ServiceBodyNawsCode.root_server_id == root_server_id, ServiceBodyNawsCode.bmlt_id == bmlt_id).delete()
     db.flush()
+    if num_rows:
+        increment_naws_codes_version(db, [root_server_id])
     return num_rows != 0
 
 
@@ -239,19 +462,24 @@ def create_format_naws_code(db: Session, root_server_id: int, bmlt_id: int, code
         db.flush()
     except IntegrityError:
         return None
+    increment_naws_codes_version(db, [root_server_id])
     db.refresh(naws_code)
     return naws_code
 
 
 def delete_format_naws_code(db: Session, id: int) -> bool:
+    root_server_ids = [root_server_id for root_server_id, in db.query(FormatNawsCode.root_server_id).filter(FormatNawsCode.id == id)]
     num_rows = db.query(FormatNawsCode).filter(FormatNawsCode.id == id).delete()
     db.flush()
+    increment_naws_codes_version(db, root_server_ids)
     return num_rows != 0
 
 
 def delete_format_naws_code_by_bmlt_id(db: Session, root_server_id: int, bmlt_id: int) -> bool:
     num_rows = db.query(FormatNawsCode).filter(FormatNawsCode.root_server_id == root_server_id, FormatNawsCode.bmlt_id == bmlt_id).delete()
     db.flush()
+    if num_rows:
+        increment_naws_codes_version(db, [root_server_id])
     return num_rows != 0
 
 
@@ -279,8 +507,10 @@ def get_meeting_naws_codes_by_bmlt_ids(db: Session, root_server_id: int, bmlt_id
     return query.all()
 
 
-def get_meetings_for_snapshot(db: Session, snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None) -> list[Meeting]:
+def get_meetings_for_snapshot(db: Session, snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None, bmlt_ids: Optional[list[int]] = None) -> list[Meeting]:
     query = db.query(Meeting).filter(Meeting.snapshot_id == snapshot_id)
+    if bmlt_ids is not None:
+        query = query.filter(Meeting.bmlt_id.in_(bmlt_ids))
     if service_body_bmlt_ids is not None:
         query = query.join(ServiceBody).filter(ServiceBody.bmlt_id.in_(service_body_bmlt_ids))
     query = query.options(subqueryload(Meeting.meeting_formats).subqueryload(MeetingFormat.format))
@@ -288,6 +518,92 @@ def get_meetings_for_snapshot(db: Session, snapshot_id: int, service_body_bmlt_i
     return query.all()
 
 
+def iter_meetings_for_snapshot(db: Session, snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None, batch_size: int = 1000) -> Iterator[Meeting]:
+    # Yields the snapshot's meetings in id order, batch_size at a time. Batches are paged by id
+    # rather than read from one server side cursor, so no connection or cursor is held open
+    # between batches and memory use doesn't depend on the driver's buffering.
+    last_id = 0
+    while True:
+        query = db.query(Meeting).filter(Meeting.snapshot_id == snapshot_id, Meeting.id > last_id)
+        if service_body_bmlt_ids is not None:
+            query = query.join(ServiceBody).filter(ServiceBody.bmlt_id.in_(service_body_bmlt_ids))
+        query = query.options(selectinload(Meeting.meeting_formats).selectinload(MeetingFormat.format))
+        query = query.options(selectinload(Meeting.service_body).selectinload(ServiceBody.parent))
+        batch = query.order_by(Meeting.id).limit(batch_size).all()
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
+
+def get_changed_meeting_bmlt_ids(db: Session, old_snapshot_id: int, new_snapshot_id: int) -> list[int]:
+    # The bmlt_ids of meetings that were created, deleted, or possibly updated between two
+    # snapshots, computed in the database. Both snapshots' rows are grouped by bmlt_id, which
+    # behaves like a full outer join on bmlt_id but needs no index to be fast. The result may
+    # contain false positives, e.g. duplicate bmlt_ids, but never misses a changed meeting.
+    # imported here because dijon.snapshot imports crud
+    from dijon.snapshot.structs import DIFFABLE_MEETING_COLUMNS
+
+    snapshot_ids = [old_snapshot_id, new_snapshot_id]
+
+    def differs(column):
+        # the pair disagrees, treating null as a value. Strings are compared as bytes so that
+        # case-insensitive collations don't hide changes.
+        if isinstance(column.type, String):
+            column = cast(column, LargeBinary)
+        return or_(func.count(distinct(column)) > 1, func.count(column) == 1)
+
+    meetings = (
+        select(Meeting.bmlt_id)
+        .join(ServiceBody, ServiceBody.id == Meeting.service_body_id)
+        .where(Meeting.snapshot_id.in_(snapshot_ids))
+        .group_by(Meeting.bmlt_id)
+        .having(
+            or_(
+                func.count() != 2,
+                func.count(distinct(Meeting.snapshot_id)) != 2,
+                differs(ServiceBody.bmlt_id),
+                *[differs(getattr(Meeting, name)) for name in DIFFABLE_MEETING_COLUMNS if name != "bmlt_id"],
+            )
+        )
+    )
+    # a format that only one of the two meetings has
+    formats = (
+        select(Meeting.bmlt_id)
+        .join(MeetingFormat, MeetingFormat.meeting_id == Meeting.id)
+        .join(Format, Format.id == MeetingFormat.format_id)
+        .where(Meeting.snapshot_id.in_(snapshot_ids))
+        .group_by(Meeting.bmlt_id, Format.bmlt_id)
+        .having(func.count(distinct(Meeting.snapshot_id)) == 1)
+    )
+    return db.execute(union(meetings, formats)).scalars().all()
+
+
+def get_meeting_event_bmlt_ids(db: Session, snapshot_ids: list[int]) -> list[int]:
+    query = db.query(MeetingEvent.bmlt_id).filter(MeetingEvent.snapshot_id.in_(snapshot_ids)).distinct()
+    return [bmlt_id for bmlt_id, in query]
+
+
+def get_meeting_events_for_meeting(
+    db: Session,
+    root_server_id: int,
+    bmlt_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> list[tuple[MeetingEvent, Snapshot]]:
+    query = db.query(MeetingEvent, Snapshot).join(Snapshot, Snapshot.id == MeetingEvent.snapshot_id)
+    query = query.filter(MeetingEvent.root_server_id == root_server_id, MeetingEvent.bmlt_id == bmlt_id)
+    if start is not None:
+        query = query.filter(Snapshot.created_at >= start)
+    if end is not None:
+        query = query.filter(Snapshot.created_at < end)
+    return query.order_by(Snapshot.created_at, MeetingEvent.id).all()
+
+
+def delete_meeting_events(db: Session, snapshot_id: int):
+    db.query(MeetingEvent).filter(MeetingEvent.snapshot_id == snapshot_id).delete(synchronize_session=False)
+
+
 def create_meeting_naws_code(db: Session, root_server_id: int, bmlt_id: int, code: str) -> Optional[MeetingNawsCode]:
     naws_code = MeetingNawsCode(root_server_id=root_server_id, bmlt_id=bmlt_id, code=code)
     db.add(naws_code)
@@ -295,6 +611,7 @@ def create_meeting_naws_code(db: Session, root_server_id: int, bmlt_id: int, cod
         db.flush()
     except IntegrityError:
         return None
+    increment_naws_codes_version(db, [root_server_id])
     db.refresh(naws_code)
     return naws_code
 
@@ -303,24 +620,32 @@ def update_meeting_naws_code(db: Session, root_server_id: int, bmlt_id: int, cod
     update = {"code": code}
     num_rows = db.query(MeetingNawsCode).filter(MeetingNawsCode.root_server_id == root_server_id).filter(MeetingNawsCode.bmlt_id == bmlt_id).update(update)
     db.flush()
+    if num_rows:
+        increment_naws_codes_version(db, [root_server_id])
     return num_rows != 0
 
 
 def delete_meeting_naws_code(db: Session, id: int) -> bool:
+    root_server_ids = [root_server_id for root_server_id, in db.query(MeetingNawsCode.root_server_id).filter(MeetingNawsCode.id == id)]
     num_rows = db.query(MeetingNawsCode).filter(MeetingNawsCode.id == id).delete()
     db.flush()
+    increment_naws_codes_version(db, root_server_ids)
     return num_rows != 0
 
 
 def delete_meeting_naws_codes(db: Session, ids: list[int]) -> bool:
+    root_server_ids = [root_server_id for root_server_id, in db.query(MeetingNawsCode.root_server_id).filter(MeetingNawsCode.id.in_(ids)).distinct()]
     num_rows = db.query(MeetingNawsCode).filter(MeetingNawsCode.id.in_(ids)).delete()
     db.flush()
+    increment_naws_codes_version(db, root_server_ids)
     return num_rows != 0
 
 
 def delete_meeting_naws_code_by_bmlt_id(db: Session, root_server_id: int, bmlt_id: int) -> bool:
     num_rows = db.query(MeetingNawsCode).filter(MeetingNawsCode.root_server_id == root_server_id, MeetingNawsCode.bmlt_id == bmlt_id).delete()
     db.flush()
+    if num_rows:
+        increment_naws_codes_version(db, [root_server_id])
     return num_rows != 0
 
 
@@ -1,7 +1,7 @@
 from contextlib import contextmanager
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
 
@@ -24,6 +24,14 @@ engine = create_engine(get_db_url(), pool_recycle=1800)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@event.listens_for(SessionLocal, "after_flush")
+def _refresh_snapshot_dates_after_flush(session: Session, flush_context):
+    # imported here because crud imports this module through dijon.models
+    from dijon.crud import refresh_snapshot_dates_after_flush
+
+    refresh_snapshot_dates_after_flush(session, flush_context)
+
+
 @contextmanager
 def db_context() -> Generator[Session, None, None]:
     session = SessionLocal()
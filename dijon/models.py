@@ -4,9 +4,11 @@ from sqlalchemy import (
     DECIMAL,
     Boolean,
     Column,
+    Date,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     Interval,
     String,
@@ -70,6 +72,8 @@ class ServiceBody(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index("ix_service_bodies_snapshot_id_bmlt_id", snapshot_id, bmlt_id),)
+
 
 class FormatNawsCode(Base):
     __tablename__ = "format_naws_codes"
@@ -98,6 +102,8 @@ class Format(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index("ix_formats_snapshot_id_bmlt_id", snapshot_id, bmlt_id),)
+
 
 class MeetingNawsCode(Base):
     __tablename__ = "meeting_naws_codes"
@@ -154,6 +160,8 @@ class Meeting(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index("ix_meetings_snapshot_id_bmlt_id", snapshot_id, bmlt_id),)
+
 
 class MeetingFormat(Base):
     __tablename__ = "meeting_formats"
@@ -167,6 +175,22 @@ class MeetingFormat(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+class MeetingEvent(Base):
+    __tablename__ = "meeting_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    snapshot_id = Column(ForeignKey("snapshots.id", ondelete="CASCADE"), nullable=False)
+    root_server_id = Column(ForeignKey("root_servers.id", ondelete="CASCADE"), nullable=False)
+    bmlt_id = Column(Integer, nullable=False)
+    event_type = Column(String(32), nullable=False)
+    # comma separated
+    changed_fields = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # a meeting's history is a range scan of this index
+    __table_args__ = (Index("ix_meeting_events_history", root_server_id, bmlt_id, snapshot_id),)
+
+
 class RootServer(Base):
     __tablename__ = "root_servers"
 
@@ -178,15 +202,64 @@ class RootServer(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    # Versions that cached responses for a root server's snapshots are keyed on. They are kept out
+    # of root_servers because a snapshot run holds foreign key locks on its root server's row until
+    # it commits, which would block every naws code change made while it runs.
+    root_server_id = Column(ForeignKey("root_servers.id", ondelete="CASCADE"), primary_key=True)
+    # incremented whenever any of the root server's naws codes change
+    naws_codes_version = Column(Integer, nullable=False, default=0, server_default='0')
+    # incremented whenever existing snapshot data is rewritten, e.g. meetings' last_changed
+    data_version = Column(Integer, nullable=False, default=0, server_default='0')
+
+
+class RootServerDeletion(Base):
+    __tablename__ = "root_server_deletions"
+
+    # Root servers waiting to be deleted by the delete-root-server command, which are hidden from
+    # the API in the meantime. Like cache_versions, this is kept out of root_servers so that a
+    # snapshot run's foreign key locks on the root server's row don't block marking it.
+    root_server_id = Column(ForeignKey("root_servers.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
 class Snapshot(Base):
     __tablename__ = "snapshots"
 
     id = Column(Integer, primary_key=True, index=True)
     root_server_id = Column(ForeignKey("root_servers.id", ondelete="CASCADE"), nullable=False)
     root_server = relationship("RootServer", uselist=False)
+    # set when nothing changed on the root server since the previous snapshot, in which case this
+    # snapshot has no rows of its own and shares the data of the snapshot it is an alias of
+    alias_of_id = Column(ForeignKey("snapshots.id", ondelete="CASCADE"), nullable=True)
+    service_bodies_digest = Column(String(64), nullable=True)
+    formats_digest = Column(String(64), nullable=True)
+    meetings_digest = Column(String(64), nullable=True)
+    # the snapshot this snapshot's meeting events were diffed against, null if its events
+    # were never recorded or that snapshot has since been deleted
+    prev_snapshot_id = Column(ForeignKey("snapshots.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (Index("ix_snapshots_root_server_id_created_at", root_server_id, created_at),)
+
+    @property
+    def data_id(self) -> int:
+        return self.alias_of_id or self.id
+
+
+class SnapshotDate(Base):
+    __tablename__ = "snapshot_dates"
+
+    # the latest snapshot of each root server on each day, which is the snapshot served for that
+    # date. It is kept up to date by crud whenever snapshots are created, deleted or redated.
+    root_server_id = Column(ForeignKey("root_servers.id", ondelete="CASCADE"), primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+    snapshot_id = Column(ForeignKey("snapshots.id", ondelete="CASCADE"), nullable=False)
+    snapshot = relationship("Snapshot", uselist=False)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -1,11 +1,17 @@
 from datetime import date, datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from starlette.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+)
 
 from dijon import crud, schemas, snapshot
 from dijon.dependencies import Context
+from dijon.utils import etag_util
 
 
 router = APIRouter()
@@ -13,11 +19,13 @@ router = APIRouter()
 
 @router.get("/rootservers/{root_server_id}/meetings/changes", response_model=schemas.MeetingChangesResponse, status_code=HTTP_200_OK)
 def list_meeting_changes(
+    response: Response,
     root_server_id: int,
     start_date: date,
     end_date: Optional[date] = None,
     service_body_bmlt_ids: Optional[list[int]] = Query(None),
     exclude_world_id_updates: bool = Query(False),
+    if_none_match: Optional[str] = Header(None),
     ctx: Context = Depends()
 ):
     if end_date is None:
@@ -34,6 +42,21 @@ def list_meeting_changes(
     if not end_snapshot:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail=f"No snapshot found for {end_date}")
 
+    sb_filter = tuple(sorted(set(service_body_bmlt_ids))) if service_body_bmlt_ids is not None else None
+    etag = etag_util.get_etag(
+        "changes",
+        start_snapshot.data_id,
+        end_snapshot.data_id,
+        start_snapshot.created_at.date(),
+        end_snapshot.created_at.date(),
+        *crud.get_cache_versions(ctx.db, root_server_id),
+        sb_filter,
+        exclude_world_id_updates,
+    )
+    if etag_util.etag_matches(if_none_match, etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     events = snapshot.diff(ctx.db, start_snapshot.id, end_snapshot.id, service_body_bmlt_ids, exclude_world_id_updates=exclude_world_id_updates)
 
     return schemas.MeetingChangesResponse(
@@ -1,11 +1,13 @@
 from datetime import date
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from starlette.status import HTTP_200_OK, HTTP_404_NOT_FOUND
 
 from dijon import crud, snapshot
 from dijon.dependencies import Context
-from dijon.snapshot import structs
+from dijon.snapshot import export, structs
+from dijon.utils import response_util
 
 
 router = APIRouter()
@@ -15,10 +17,18 @@ router = APIRouter()
 def list_snapshot_formats(
     root_server_id: int,
     date: date,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     ctx: Context = Depends()
 ):
     snap = crud.get_snapshot_by_date(ctx.db, root_server_id, date)
     if not snap:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No snapshots found on date")
 
-    return snapshot.get_formats(ctx.db, snap.id)
+    return response_util.json_export_response(
+        snapshot.get_formats_key(ctx.db, snap),
+        if_none_match,
+        accept_encoding,
+        lambda: snapshot.get_export_path(ctx.db, snap, export.FORMATS),
+        lambda: snapshot.get_formats_json(ctx.db, snap),
+    )
@@ -1,12 +1,14 @@
-from datetime import date
+from datetime import date, datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from starlette.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED, HTTP_404_NOT_FOUND
 
-from dijon import crud, snapshot
+from dijon import crud, schemas, snapshot
 from dijon.dependencies import Context
-from dijon.snapshot import structs
+from dijon.snapshot import export, structs
+from dijon.utils import etag_util, response_util
 
 
 router = APIRouter()
@@ -17,10 +19,52 @@ def list_snapshot_meetings(
     root_server_id: int,
     date: date,
     service_body_bmlt_ids: Optional[list[int]] = Query(None),
+    format: schemas.ResponseFormat = schemas.ResponseFormat.JSON,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
     ctx: Context = Depends()
 ):
     snap = crud.get_snapshot_by_date(ctx.db, root_server_id, date)
     if not snap:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="No snapshots found on date")
 
-    return snapshot.get_meetings(ctx.db, snap.id, service_body_bmlt_ids)
+    key = snapshot.get_meetings_key(ctx.db, snap, service_body_bmlt_ids) + (format.value,)
+    if format == schemas.ResponseFormat.NDJSON:
+        etag = etag_util.get_etag(*key)
+        if etag_util.etag_matches(if_none_match, etag):
+            return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        # streamed a batch of meetings at a time, so memory use doesn't grow with the root server
+        content = snapshot.iter_meetings_ndjson(ctx.db, snap.id, service_body_bmlt_ids)
+        return StreamingResponse(content, media_type="application/x-ndjson", headers={"ETag": etag})
+
+    # filtered responses are never exported
+    return response_util.json_export_response(
+        key,
+        if_none_match,
+        accept_encoding,
+        lambda: snapshot.get_export_path(ctx.db, snap, export.MEETINGS) if service_body_bmlt_ids is None else None,
+        lambda: snapshot.get_meetings_json(ctx.db, snap, service_body_bmlt_ids),
+    )
+
+
+@router.get("/rootservers/{root_server_id}/meetings/{bmlt_id}/history", response_model=list[schemas.MeetingHistoryEvent], status_code=HTTP_200_OK)
+def list_meeting_history(
+    root_server_id: int,
+    bmlt_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    ctx: Context = Depends()
+):
+    if not crud.get_root_server(ctx.db, root_server_id):
+        raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="Root server not found")
+
+    start = datetime.fromordinal(start_date.toordinal()) if start_date else None
+    end = datetime.fromordinal(end_date.toordinal()) + timedelta(days=1) if end_date else None
+    return [
+        schemas.MeetingHistoryEvent(
+            date=db_snapshot.created_at.date(),
+            event_type=db_event.event_type,
+            changed_fields=db_event.changed_fields.split(",") if db_event.changed_fields else [],
+        )
+        for db_event, db_snapshot in crud.get_meeting_events_for_meeting(ctx.db, root_server_id, bmlt_id, start=start, end=end)
+    ]
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Response
 from starlette.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
     HTTP_204_NO_CONTENT,
     HTTP_401_UNAUTHORIZED,
     HTTP_404_NOT_FOUND,
@@ -48,10 +49,12 @@ def update_root_server(root_server: schemas.RootServerUpdate, root_server_id: in
         raise HTTPException(status_code=HTTP_404_NOT_FOUND)
 
 
-@router.delete("/rootservers/{root_server_id}", status_code=HTTP_204_NO_CONTENT, response_class=Response)
+@router.delete("/rootservers/{root_server_id}", status_code=HTTP_202_ACCEPTED, response_class=Response)
 def delete_root_server(root_server_id: int, ctx: Context = Depends()):
     if not ctx.is_authenticated:
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED)
 
-    if not crud.delete_root_server(ctx.db, root_server_id):
+    # the root server is hidden straight away, and its snapshots are deleted in batches by the
+    # delete-root-server command, which is too long a job for a request
+    if not crud.mark_root_server_for_deletion(ctx.db, root_server_id):
         raise HTTPException(status_code=HTTP_404_NOT_FOUND)
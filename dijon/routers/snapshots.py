@@ -12,28 +12,15 @@ router = APIRouter()
 
 @router.get("/snapshots", response_model=list[schemas.Snapshot], status_code=HTTP_200_OK)
 def list_snapshots(ctx: Context = Depends()):
-    snapshots = []
-    last = None  # use this to make sure we only return the latest snapshot for each server for each day
-    for db_snapshot in crud.get_snapshots(ctx.db):
-        snapshot = schemas.Snapshot(root_server_id=db_snapshot.root_server_id, date=db_snapshot.created_at.date())
-        if last and snapshot.root_server_id == last.root_server_id and snapshot.date == last.date:
-            snapshots.pop()
-        snapshots.append(snapshot)
-        last = snapshot
-    return snapshots
+    # there is a row for each root server for each day that has any snapshots
+    snapshot_dates = crud.get_snapshot_dates(ctx.db)
+    return [schemas.Snapshot(root_server_id=sd.root_server_id, date=sd.snapshot_date) for sd in snapshot_dates]
 
 
 @router.get("/rootservers/{root_server_id}/snapshots", response_model=list[schemas.Snapshot], status_code=HTTP_200_OK)
 def list_server_snapshots(root_server_id: int, ctx: Context = Depends()):
-    snapshots = []
-    last = None  # use this to make sure we only return the latest snapshot for each day
-    for db_snapshot in crud.get_snapshots(ctx.db, root_server_id):
-        snapshot = schemas.Snapshot(root_server_id=db_snapshot.root_server_id, date=db_snapshot.created_at.date())
-        if last and snapshot.date == last.date:
-            snapshots.pop()
-        snapshots.append(snapshot)
-        last = snapshot
-    return snapshots
+    snapshot_dates = crud.get_snapshot_dates(ctx.db, root_server_id)
+    return [schemas.Snapshot(root_server_id=sd.root_server_id, date=sd.snapshot_date) for sd in snapshot_dates]
 
 
 @router.get("/rootservers/{root_server_id}/snapshots/{date}", response_model=schemas.Snapshot, status_code=HTTP_200_OK)
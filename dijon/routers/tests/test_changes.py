@@ -23,3 +23,27 @@ def test_meeting_changes_missing_end_snapshot(ctx: Ctx):
     end_date = start_date + timedelta(days=1)
     response = ctx.client.get(f"/rootservers/{rs.id}/meetings/changes", params={"start_date": snap.created_at.date(), "end_date": end_date})
     assert response.status_code == 404
+
+
+def test_meeting_changes_etag(ctx: Ctx):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap_1 = crud.create_snapshot(ctx.db, rs)
+    snap_2 = crud.create_snapshot(ctx.db, rs)
+    snap_2.created_at = snap_2.created_at + timedelta(days=1)
+    ctx.db.add(snap_2)
+    ctx.db.flush()
+    ctx.db.refresh(snap_2)
+    params = {"start_date": str(snap_1.created_at.date()), "end_date": str(snap_2.created_at.date())}
+
+    response = ctx.client.get(f"/rootservers/{rs.id}/meetings/changes", params=params)
+    assert response.status_code == 200
+    assert response.json()["events"] == []
+    etag = response.headers["etag"]
+
+    response = ctx.client.get(f"/rootservers/{rs.id}/meetings/changes", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    params["exclude_world_id_updates"] = True
+    response = ctx.client.get(f"/rootservers/{rs.id}/meetings/changes", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
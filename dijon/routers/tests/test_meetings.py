@@ -1,11 +1,15 @@
+import json
 from datetime import time, timedelta
 from decimal import Decimal
 from typing import Any
+from unittest.mock import patch
 
 from sqlalchemy.orm import Session
 
 from dijon import crud, models
 from dijon.conftest import Ctx
+from dijon.snapshot import export
+from dijon.utils.cache_util import response_cache
 
 
 def get_meeting_kwargs(snapshot: models.Snapshot = None, service_body: models.ServiceBody = None, bmlt_id: int = None) -> dict[str, Any]:
@@ -100,3 +104,164 @@ def test_list_snapshot_meetings(ctx: Ctx):
     assert len(data) == 2
     for sb in data:
         assert sb["bmlt_id"] in (7, 8)
+
+
+def test_list_meeting_history(ctx: Ctx):
+    rs_1 = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    rs_2 = crud.create_root_server(ctx.db, "root 2", "https://1/main_server/", True)
+    snap_1 = crud.create_snapshot(ctx.db, rs_1)
+    snap_2 = crud.create_snapshot(ctx.db, rs_1)
+    snap_3 = crud.create_snapshot(ctx.db, rs_2)
+    snap_2.created_at = snap_2.created_at + timedelta(weeks=1)
+    ctx.db.add(snap_2)
+    ctx.db.add_all([
+        models.MeetingEvent(snapshot_id=snap_2.id, root_server_id=rs_1.id, bmlt_id=1, event_type="MeetingUpdated", changed_fields="name,day"),
+        models.MeetingEvent(snapshot_id=snap_1.id, root_server_id=rs_1.id, bmlt_id=1, event_type="MeetingCreated", changed_fields=""),
+        models.MeetingEvent(snapshot_id=snap_1.id, root_server_id=rs_1.id, bmlt_id=2, event_type="MeetingCreated", changed_fields=""),
+        models.MeetingEvent(snapshot_id=snap_3.id, root_server_id=rs_2.id, bmlt_id=1, event_type="MeetingDeleted", changed_fields=""),
+    ])
+    ctx.db.flush()
+    ctx.db.refresh(snap_1)
+    ctx.db.refresh(snap_2)
+
+    response = ctx.client.get(f"/rootservers/{rs_1.id}/meetings/1/history")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"date": str(snap_1.created_at.date()), "event_type": "MeetingCreated", "changed_fields": []},
+        {"date": str(snap_2.created_at.date()), "event_type": "MeetingUpdated", "changed_fields": ["name", "day"]},
+    ]
+
+    response = ctx.client.get(f"/rootservers/{rs_1.id}/meetings/1/history", params={"start_date": str(snap_2.created_at.date())})
+    assert [e["event_type"] for e in response.json()] == ["MeetingUpdated"]
+
+    response = ctx.client.get(f"/rootservers/{rs_1.id}/meetings/1/history", params={"end_date": str(snap_1.created_at.date())})
+    assert [e["event_type"] for e in response.json()] == ["MeetingCreated"]
+
+    response = ctx.client.get(f"/rootservers/{rs_1.id}/meetings/3/history")
+    assert response.json() == []
+
+
+def test_list_meeting_history_missing_root_server(ctx: Ctx):
+    response = ctx.client.get("/rootservers/1234/meetings/1/history")
+    assert response.status_code == 404
+
+
+def test_list_snapshot_meetings_naws_code_change(ctx: Ctx):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(ctx.db, rs)
+    sb = crud.create_service_body(ctx.db, snap.id, 1, 'test', 'test')
+    create_meeting(ctx.db, **get_meeting_kwargs(snap, sb, 1))
+    url = f"/rootservers/{rs.id}/snapshots/{str(snap.created_at.date())}/meetings"
+
+    response = ctx.client.get(url)
+    assert response.json()[0]["naws_code_override"] is None
+
+    # the cached response is invalidated by the change in naws codes
+    naws_codes_version, data_version = crud.get_cache_versions(ctx.db, rs.id)
+    crud.create_meeting_naws_code(ctx.db, rs.id, 1, "G123")
+    assert crud.get_cache_versions(ctx.db, rs.id) == (naws_codes_version + 1, data_version)
+    response = ctx.client.get(url)
+    assert response.json()[0]["naws_code_override"] == "G123"
+
+    crud.update_meeting_naws_code(ctx.db, rs.id, 1, "G456")
+    response = ctx.client.get(url)
+    assert response.json()[0]["naws_code_override"] == "G456"
+
+    crud.delete_meeting_naws_code_by_bmlt_id(ctx.db, rs.id, 1)
+    response = ctx.client.get(url)
+    assert response.json()[0]["naws_code_override"] is None
+
+
+def test_list_snapshot_meetings_etag(ctx: Ctx):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(ctx.db, rs)
+    sb = crud.create_service_body(ctx.db, snap.id, 1, 'test', 'test')
+    create_meeting(ctx.db, **get_meeting_kwargs(snap, sb, 1))
+    url = f"/rootservers/{rs.id}/snapshots/{str(snap.created_at.date())}/meetings"
+
+    response = ctx.client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = ctx.client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # a different service body filter is a different response
+    response = ctx.client.get(url, params={"service_body_bmlt_ids": [1]}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+    crud.create_meeting_naws_code(ctx.db, rs.id, 1, "G123")
+    response = ctx.client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_list_snapshot_meetings_export(ctx: Ctx, tmp_path):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(ctx.db, rs)
+    sb = crud.create_service_body(ctx.db, snap.id, 1, 'test', 'test')
+    create_meeting(ctx.db, **get_meeting_kwargs(snap, sb, 1))
+    url = f"/rootservers/{rs.id}/snapshots/{str(snap.created_at.date())}/meetings"
+    expected = ctx.client.get(url).json()
+
+    with patch("dijon.snapshot.export.get_export_dir", lambda: str(tmp_path)):
+        export.write_exports(ctx.db, snap)
+        response_cache.clear()
+
+        # the gzipped export is sent as is
+        response = ctx.client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json() == expected
+        assert "last-modified" not in response.headers
+        gzip_etag = response.headers["etag"]
+
+        response = ctx.client.get(url, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == expected
+        etag = response.headers["etag"]
+
+        # each content-coding has its own strong etag, and either revalidates
+        assert etag != gzip_etag
+        for if_none_match in (etag, gzip_etag):
+            response = ctx.client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": if_none_match})
+            assert response.status_code == 304
+            assert response.headers["etag"] == if_none_match
+            assert response.headers["vary"] == "Accept-Encoding"
+
+        response = ctx.client.get(url, params={"service_body_bmlt_ids": [1]}, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.json() == expected
+
+        # naws codes are applied to the export instead
+        crud.create_meeting_naws_code(ctx.db, rs.id, 1, "G123")
+        response = ctx.client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.json()[0]["naws_code_override"] == "G123"
+
+
+def test_list_snapshot_meetings_ndjson(ctx: Ctx):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(ctx.db, rs)
+    sb_1 = crud.create_service_body(ctx.db, snap.id, 1, 'test', 'test')
+    sb_2 = crud.create_service_body(ctx.db, snap.id, 2, 'test', 'test')
+    for bmlt_id in range(1, 6):
+        create_meeting(ctx.db, **get_meeting_kwargs(snap, sb_1 if bmlt_id % 2 else sb_2, bmlt_id))
+    crud.create_meeting_naws_code(ctx.db, rs.id, 1, "G123")
+    url = f"/rootservers/{rs.id}/snapshots/{str(snap.created_at.date())}/meetings"
+
+    response = ctx.client.get(url, params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == ctx.client.get(url).json()
+    assert response.headers["etag"] != ctx.client.get(url).headers["etag"]
+
+    response = ctx.client.get(url, params={"format": "ndjson", "service_body_bmlt_ids": [2]})
+    assert [json.loads(line)["bmlt_id"] for line in response.text.splitlines()] == [2, 4]
+
+    # batches are paged by id
+    assert [m.bmlt_id for m in crud.iter_meetings_for_snapshot(ctx.db, snap.id, batch_size=2)] == [1, 2, 3, 4, 5]
+
+    response = ctx.client.get(url, params={"format": "xml"})
+    assert response.status_code == 422
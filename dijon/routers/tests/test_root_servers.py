@@ -86,8 +86,25 @@ def test_delete_root_server(ctx: Ctx, headers: dict[str, str]):
     rs_1 = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
 
     response = ctx.client.delete(f"/rootservers/{rs_1.id}", headers=headers)
-    assert response.status_code == 204
+    assert response.status_code == 202
+    response = ctx.client.delete(f"/rootservers/{rs_1.id}", headers=headers)
+    assert response.status_code == 404
+
+
+def test_delete_root_server_hidden(ctx: Ctx, headers: dict[str, str]):
+    rs_1 = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    rs_2 = crud.create_root_server(ctx.db, "root 2", "https://2/main_server/", True)
+
     response = ctx.client.delete(f"/rootservers/{rs_1.id}", headers=headers)
+    assert response.status_code == 202
+    # the root server is left for delete-root-server, but is gone as far as the api is concerned
+    assert crud.get_root_server(ctx.db, rs_1.id, include_marked=True) is not None
+    response = ctx.client.get(f"/rootservers/{rs_1.id}")
+    assert response.status_code == 404
+    response = ctx.client.get("/rootservers")
+    assert [root_server["id"] for root_server in response.json()] == [rs_2.id]
+    payload = schemas.RootServerUpdate(name="blah")
+    response = ctx.client.patch(f"/rootservers/{rs_1.id}", json=payload.dict(), headers=headers)
     assert response.status_code == 404
 
 
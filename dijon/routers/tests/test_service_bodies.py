@@ -49,3 +49,22 @@ def test_list_snapshot_service_bodies(ctx: Ctx):
     assert len(data) == 2
     for sb in data:
         assert sb["bmlt_id"] in (7, 8)
+
+
+def test_list_snapshot_service_bodies_etag(ctx: Ctx):
+    rs = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(ctx.db, rs)
+    crud.create_service_body(ctx.db, snap.id, 1, 'test', 'test')
+    url = f"/rootservers/{rs.id}/snapshots/{str(snap.created_at.date())}/servicebodies"
+
+    response = ctx.client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = ctx.client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    crud.create_service_body_naws_code(ctx.db, rs.id, 1, "S1")
+    response = ctx.client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
@@ -40,6 +40,22 @@ def test_list_server_snapshots(ctx: Ctx):
     assert len(data) == 2
 
 
+def test_list_snapshots_marked_for_deletion(ctx: Ctx):
+    rs_1 = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
+    rs_2 = crud.create_root_server(ctx.db, "root 2", "https://2/main_server/", True)
+    crud.create_snapshot(ctx.db, rs_1)
+    crud.create_snapshot(ctx.db, rs_2)
+    crud.mark_root_server_for_deletion(ctx.db, rs_1.id)
+
+    response = ctx.client.get("/snapshots")
+    assert response.status_code == 200
+    assert [s["root_server_id"] for s in response.json()] == [rs_2.id]
+
+    response = ctx.client.get(f"/rootservers/{rs_1.id}/snapshots")
+    assert response.status_code == 200
+    assert response.json() == []
+
+
 def test_get_server_snapshot(ctx: Ctx):
     rs_1 = crud.create_root_server(ctx.db, "root 1", "https://1/main_server/", True)
     crud.create_snapshot(ctx.db, rs_1)
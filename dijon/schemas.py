@@ -1,4 +1,5 @@
 from datetime import date
+from enum import Enum
 from typing import Optional
 
 from pydantic import AnyHttpUrl, BaseModel, EmailStr, constr
@@ -87,6 +88,23 @@ class MeetingChangesResponse(BaseModel):
     events: list[structs.MeetingEvent]
 
 
+# Response formats
+#
+#
+class ResponseFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+
+
+# MeetingHistory
+#
+#
+class MeetingHistoryEvent(BaseModel):
+    date: date
+    event_type: structs.MeetingEventType
+    changed_fields: list[str]
+
+
 # NawsCodes
 #
 #
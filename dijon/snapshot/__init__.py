@@ -1,10 +1,36 @@
 from dijon.snapshot.create import create_snapshot
 from dijon.snapshot.diff import diff_snapshots
-from dijon.snapshot.get import get_formats, get_meetings, get_service_bodies
+from dijon.snapshot.get import (
+    get_export_path,
+    get_formats,
+    get_formats_json,
+    get_formats_key,
+    get_meetings,
+    get_meetings_json,
+    get_meetings_key,
+    get_service_bodies,
+    get_service_bodies_json,
+    get_service_bodies_key,
+    iter_meetings_ndjson,
+)
 
 
 diff = diff_snapshots
 create = create_snapshot
 
 
-__all__ = ["diff", "create", "get_formats", "get_meetings", "get_service_bodies"]
+__all__ = [
+    "diff",
+    "create",
+    "get_export_path",
+    "get_formats",
+    "get_formats_json",
+    "get_formats_key",
+    "get_meetings",
+    "get_meetings_json",
+    "get_meetings_key",
+    "get_service_bodies",
+    "get_service_bodies_json",
+    "get_service_bodies_key",
+    "iter_meetings_ndjson",
+]
@@ -1,15 +1,19 @@
-from typing import Optional
+from typing import Any, Callable, Optional, TypeVar
 
 from sqlalchemy.orm import Session
 
 from dijon import crud, models
 
 
+T = TypeVar("T")
+
+
 class SnapshotCache:
     def __init__(self, db: Session, snapshot: models.Snapshot):
         self._db = db
         self._snapshot = snapshot
         self._service_bodies: Optional[dict[int, models.ServiceBody]] = None
+        self._formats: Optional[dict[int, list[models.Format]]] = None
         self._meeting_naws_codes: Optional[dict[int, models.MeetingNawsCode]] = None
         self._naws_code_cache = NawsCodeCache(db, snapshot.root_server)
 
@@ -28,11 +32,28 @@ class SnapshotCache:
     def get_service_body(self, bmlt_id: int) -> Optional[models.ServiceBody]:
         return self.service_bodies.get(bmlt_id)
 
+    @property
+    def formats(self) -> dict[int, list[models.Format]]:
+        # a list per bmlt_id, so that a meeting is linked to every format row with a matching id,
+        # just as get_formats_by_bmlt_ids does, should a root server ever return duplicates
+        if self._formats is None:
+            self._formats = {}
+            for db_format in crud.get_formats_for_snapshot(self._db, self._snapshot.id):
+                self._formats.setdefault(db_format.bmlt_id, []).append(db_format)
+        return self._formats
+
+    def get_formats(self, bmlt_ids: list[int]) -> list[models.Format]:
+        db_formats = []
+        for bmlt_id in sorted(set(bmlt_ids)):
+            db_formats.extend(self.formats.get(bmlt_id, []))
+        return db_formats
+
     def get_meeting_naws_code(self, bmlt_id: int) -> Optional[models.MeetingNawsCode]:
         return self._naws_code_cache.get_meeting_naws_code.get(bmlt_id)
 
     def clear(self):
         self._service_bodies = None
+        self._formats = None
         self._meeting_naws_codes = None
 
 
@@ -43,6 +64,7 @@ class NawsCodeCache:
         self._meeting_naws_codes: Optional[dict[int, models.MeetingNawsCode]] = None
         self._service_body_naws_codes: Optional[dict[int, models.ServiceBodyNawsCode]] = None
         self._format_naws_codes: Optional[dict[int, models.FormatNawsCode]] = None
+        self._built: dict[tuple[Callable, int], Any] = {}
 
     @property
     def meeting_naws_codes(self) -> dict[int, models.MeetingNawsCode]:
@@ -74,7 +96,30 @@ class NawsCodeCache:
     def get_format_naws_code(self, bmlt_id: int) -> Optional[models.FormatNawsCode]:
         return self.format_naws_codes.get(bmlt_id)
 
+    def memoize(self, build: Callable[[Any, "NawsCodeCache"], T], db_obj: Any) -> T:
+        # A snapshot's few hundred service bodies and formats are shared by all of its meetings,
+        # so whatever is built from one of them (a struct, or its json) is built once per db row.
+        # What gets built depends on the naws codes, so it is cleared along with them.
+        key = (build, db_obj.id)
+        value = self._built.get(key)
+        if value is None:
+            value = self._built[key] = build(db_obj, self)
+        return value
+
     def clear(self):
         self._meeting_naws_codes = None
         self._service_body_naws_codes = None
         self._format_naws_codes = None
+        self._built = {}
+
+
+class EmptyNawsCodeCache(NawsCodeCache):
+    """A NawsCodeCache without any naws codes, for rendering snapshots with no overrides."""
+    def __init__(self):
+        super().__init__(None, None)
+        self._meeting_naws_codes = {}
+        self._service_body_naws_codes = {}
+        self._format_naws_codes = {}
+
+    def clear(self):
+        pass
@@ -0,0 +1,88 @@
+import logging
+from datetime import date
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+from dijon.settings import settings
+from dijon.snapshot.create import replace_meeting_events
+from dijon.snapshot.delete import add_counts, delete_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_retained_snapshot_ids(snapshots: list[models.Snapshot], today: date, daily_days: int, weekly_days: int) -> set[int]:
+    # The retention policy: the latest snapshot of each day for the last daily_days days, then the
+    # latest of each week until weekly_days days ago, and the latest of each month before that.
+    # The latest snapshot is always kept. snapshots must be in created_at order.
+    latest_by_period = {}
+    for snapshot in snapshots:
+        snapshot_date = snapshot.created_at.date()
+        age = (today - snapshot_date).days
+        if age < daily_days:
+            period = ("day", snapshot_date)
+        elif age < weekly_days:
+            period = ("week",) + tuple(snapshot_date.isocalendar()[:2])
+        else:
+            period = ("month", snapshot_date.year, snapshot_date.month)
+        latest_by_period[period] = snapshot.id
+    retained_ids = set(latest_by_period.values())
+    if snapshots:
+        retained_ids.add(snapshots[-1].id)
+    return retained_ids
+
+
+def compact_snapshots(
+    db: Session,
+    root_server: models.RootServer,
+    today: date,
+    daily_days: Optional[int] = None,
+    weekly_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    commit: bool = False,
+    dry_run: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> dict[str, int]:
+    # Deletes the root server's snapshots that the retention policy doesn't keep and returns the
+    # number of rows deleted from each table.
+    daily_days = daily_days if daily_days is not None else settings.get("SNAPSHOT_RETENTION_DAILY_DAYS", 90)
+    weekly_days = weekly_days if weekly_days is not None else settings.get("SNAPSHOT_RETENTION_WEEKLY_DAYS", 365)
+    snapshots = crud.get_snapshots(db, root_server.id)
+    retained_ids = get_retained_snapshot_ids(snapshots, today, daily_days, weekly_days)
+    # an alias has no data of its own, so the snapshot it is an alias of stays too
+    retained_ids.update([s.alias_of_id for s in snapshots if s.id in retained_ids and s.alias_of_id])
+    deleted = [s for s in snapshots if s.id not in retained_ids]
+    counts = {models.Snapshot.__tablename__: len(deleted)}
+    if dry_run or not deleted:
+        return counts
+
+    # Each snapshot's meeting events are its diff against the snapshot before it. Where that one
+    # is about to be deleted, the events are recomputed against the previous retained snapshot,
+    # so the history and the events diff strategy still see every change across the gap. Each
+    # meeting's last_changed is stored on its own row, so it is unaffected.
+    deleted_ids = {s.id for s in deleted}
+    prev_snapshot = None
+    for snapshot in snapshots:
+        if snapshot.id in deleted_ids:
+            continue
+        if prev_snapshot and snapshot.prev_snapshot_id in deleted_ids:
+            replace_meeting_events(db, snapshot, prev_snapshot)
+            if commit:
+                db.commit()
+        prev_snapshot = snapshot
+
+    # aliases go before the snapshots they are aliases of, whose deletion would cascade to them
+    counts = {}
+    for snapshot in sorted(deleted, key=lambda s: s.alias_of_id is None):
+        add_counts(counts, delete_snapshot(db, snapshot, batch_size=batch_size, commit=commit, progress=progress))
+    return counts
+
+
+def get_reclaimed_bytes(db: Session, counts: dict[str, int]) -> Optional[int]:
+    # an estimate from the tables' average row lengths, where the database reports them
+    avg_row_lengths = crud.get_table_avg_row_lengths(db)
+    if not avg_row_lengths:
+        return None
+    return sum(num_rows * avg_row_lengths.get(table, 0) for table, num_rows in counts.items())
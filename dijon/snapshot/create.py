@@ -1,17 +1,22 @@
 import logging
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from datetime import time, timedelta
 from decimal import Decimal, InvalidOperation
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional
 from urllib.parse import urljoin
 
-import requests
 from pydantic import BaseModel, Field, conint, constr, validator
 from pydantic.validators import str_validator
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from dijon import crud, models
+from dijon.settings import settings
 from dijon.snapshot.cache import SnapshotCache
-from dijon.snapshot.diff import diff_snapshots, structs
+from dijon.snapshot.diff import DiffStrategy, diff_snapshots, structs
+from dijon.utils.http_util import stream_json
 
 
 logger = logging.getLogger(__name__)
@@ -37,9 +42,17 @@ class BmltServiceBody(BaseModel):
 
     @classmethod
     def from_url(cls, url: str) -> list["BmltServiceBody"]:
+        with stream_json(cls.get_url(url)) as raw_service_bodies:
+            return cls.from_json(raw_service_bodies)
+
+    @staticmethod
+    def get_url(url: str) -> str:
+        return urljoin(url, "client_interface/json/?switcher=GetServiceBodies")
+
+    @classmethod
+    def from_json(cls, raw_service_bodies: Iterable[Any]) -> list["BmltServiceBody"]:
         service_bodies = []
-        url = urljoin(url, "client_interface/json/?switcher=GetServiceBodies")
-        for raw in get_json(url):
+        for raw in raw_service_bodies:
             try:
                 obj = cls(**raw)
             except ValueError:
@@ -71,9 +84,17 @@ class BmltFormat(BaseModel):
 
     @classmethod
     def from_url(cls, url: str) -> list["BmltFormat"]:
+        with stream_json(cls.get_url(url)) as raw_formats:
+            return cls.from_json(raw_formats)
+
+    @staticmethod
+    def get_url(url: str) -> str:
+        return urljoin(url, "client_interface/json/?switcher=GetFormats")
+
+    @classmethod
+    def from_json(cls, raw_formats: Iterable[Any]) -> list["BmltFormat"]:
         formats = []
-        url = urljoin(url, "client_interface/json/?switcher=GetFormats")
-        for raw in get_json(url):
+        for raw in raw_formats:
             try:
                 obj = cls(**raw)
             except ValueError:
@@ -125,28 +146,39 @@ class BmltMeeting(BaseModel):
     published: bool
 
     @classmethod
-    def from_url(cls, url: str, bmlt_service_bodies: list[BmltServiceBody]) -> list["BmltMeeting"]:
-        valid_sb_ids = {sb.id for sb in bmlt_service_bodies}
-        meetings = []
-        url = urljoin(url, "client_interface/json/?switcher=GetSearchResults&advanced_published=0")
-        for raw in get_json(url):
+    def from_url(cls, url: str, bmlt_service_bodies: Optional[list[BmltServiceBody]] = None) -> list["BmltMeeting"]:
+        with stream_json(cls.get_url(url)) as raw_meetings:
+            return list(cls.from_json(raw_meetings, bmlt_service_bodies))
+
+    @staticmethod
+    def get_url(url: str) -> str:
+        return urljoin(url, "client_interface/json/?switcher=GetSearchResults&advanced_published=0")
+
+    @classmethod
+    def from_json(cls, raw_meetings: Iterable[Any], bmlt_service_bodies: Optional[list[BmltServiceBody]] = None) -> Iterator["BmltMeeting"]:
+        valid_sb_ids = {sb.id for sb in bmlt_service_bodies} if bmlt_service_bodies is not None else None
+        for raw in raw_meetings:
             try:
                 obj = cls(**raw)
-                if obj.service_body_bigint not in valid_sb_ids:
-                    continue
             except ValueError:
                 # TODO report this somewhere
                 continue
-            else:
-                meetings.append(obj)
-        return meetings
+            if valid_sb_ids is not None and obj.service_body_bigint not in valid_sb_ids:
+                continue
+            yield obj
 
     def to_db(self, db: Session, cache: SnapshotCache) -> tuple[models.Meeting, list[models.MeetingFormat]]:
+        db_meeting = models.Meeting(**self.to_db_values(cache))
+        db_formats = cache.get_formats(self.format_shared_id_list)
+        db_meeting_formats = [models.MeetingFormat(meeting=db_meeting, format=db_format) for db_format in db_formats]
+        return db_meeting, db_meeting_formats
+
+    def to_db_values(self, cache: SnapshotCache) -> dict[str, Any]:
         service_body = cache.get_service_body(self.service_body_bigint)
         if not service_body:
             raise ValueError("invalid service body")
 
-        db_meeting = models.Meeting(
+        return dict(
             snapshot_id=cache.snapshot.id,
             bmlt_id=self.id_bigint,
             name=self.meeting_name,
@@ -178,10 +210,6 @@ class BmltMeeting(BaseModel):
             virtual_meeting_additional_info=self.virtual_meeting_additional_info
         )
 
-        db_formats = crud.get_formats_by_bmlt_ids(db, cache.snapshot.id, self.format_shared_id_list)
-        db_meeting_formats = [models.MeetingFormat(meeting=db_meeting, format=db_format) for db_format in db_formats]
-        return db_meeting, db_meeting_formats
-
     @validator("format_shared_id_list", pre=True)
     def format_shared_id_list_pre(cls, v):
         if v is None:
@@ -221,56 +249,85 @@ class BmltMeeting(BaseModel):
             return None
 
 
-def get_json(url: str) -> list[Any]:
-    # This is just a random user agent that doesn't seem to get blocked by webhosts
-    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0 +dijon'}
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"Unexpected status code {response.status_code} GET {url}")
-    return response.json()
-
-
-def create_snapshot(db: Session, root_server: models.RootServer):
+def create_snapshot(db: Session, root_server: models.RootServer) -> models.Snapshot:
     logger.info(f"creating snapshot for {root_server.id}:{root_server.url}...")
     snapshot = crud.create_snapshot(db, root_server)
 
-    logger.info("getting service bodies...")
-    bmlt_service_bodies = BmltServiceBody.from_url(root_server.url)
-    logger.info(f"saving {len(bmlt_service_bodies)} service bodies...")
-    save_service_bodies(db, snapshot, bmlt_service_bodies)
+    # the three switcher calls are independent, so fetch them concurrently and only
+    # keep the database writes ordered
+    logger.info("getting service bodies, formats, and meetings...")
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(stream_json, cls.get_url(root_server.url)) for cls in (BmltServiceBody, BmltFormat, BmltMeeting)]
+
+    with ExitStack() as stack:
+        # every stream that was fetched is closed, even when another fetch failed
+        for future in futures:
+            if future.exception() is None:
+                stack.enter_context(future.result())
+        raw_service_bodies, raw_formats, raw_meetings = [future.result() for future in futures]
+
+        snapshot.service_bodies_digest = raw_service_bodies.digest
+        snapshot.formats_digest = raw_formats.digest
+        snapshot.meetings_digest = raw_meetings.digest
+        db.add(snapshot)
+
+        prev_snapshot = crud.get_previous_snapshot(db, snapshot.id)
+        if prev_snapshot and is_unchanged(snapshot, prev_snapshot):
+            # Nothing changed on the root server, so rather than saving and diffing a full copy
+            # of the previous snapshot, this snapshot just points at the previous one's data.
+            logger.info(f"payloads unchanged since snapshot {prev_snapshot.id}, aliasing snapshot {prev_snapshot.data_id}")
+            snapshot.alias_of_id = prev_snapshot.data_id
+            snapshot.prev_snapshot_id = prev_snapshot.id
+            db.flush()
+            return snapshot
+
+        bmlt_service_bodies = BmltServiceBody.from_json(raw_service_bodies)
+        logger.info(f"saving {len(bmlt_service_bodies)} service bodies...")
+        save_service_bodies(db, snapshot, bmlt_service_bodies)
+
+        bmlt_formats = BmltFormat.from_json(raw_formats)
+        logger.info(f"saving {len(bmlt_formats)} formats...")
+        save_formats(db, snapshot, bmlt_formats)
+
+        # meetings are validated and saved in batches straight off the spooled response,
+        # so memory use doesn't grow with the size of the root server
+        logger.info("saving meetings...")
+        bmlt_meetings = BmltMeeting.from_json(raw_meetings, bmlt_service_bodies)
+        num_meetings = save_meetings(db, snapshot, bmlt_meetings, batch_size=settings.get("SNAPSHOT_BATCH_SIZE", 1000))
+        logger.info(f"saved {num_meetings} meetings")
 
-    logger.info("getting formats...")
-    bmlt_formats = BmltFormat.from_url(root_server.url)
-    logger.info(f"saving {len(bmlt_formats)} formats...")
-    save_formats(db, snapshot, bmlt_formats)
+    if prev_snapshot:
+        events = update_meetings_last_changed(db, snapshot, prev_snapshot)
+        save_meeting_events(db, snapshot, events)
+        snapshot.prev_snapshot_id = prev_snapshot.id
+        db.flush()
 
-    logger.info("getting meetings...")
-    bmlt_meetings = BmltMeeting.from_url(root_server.url, bmlt_service_bodies)
-    logger.info(f"saving {len(bmlt_meetings)} meetings...")
-    save_meetings(db, snapshot, bmlt_meetings)
+    return snapshot
 
-    prev_snapshot = crud.get_previous_snapshot(db, snapshot.id)
-    if prev_snapshot:
-        update_meetings_last_changed(db, snapshot, prev_snapshot)
+
+def is_unchanged(snapshot: models.Snapshot, prev_snapshot: models.Snapshot) -> bool:
+    digests = (snapshot.service_bodies_digest, snapshot.formats_digest, snapshot.meetings_digest)
+    prev_digests = (prev_snapshot.service_bodies_digest, prev_snapshot.formats_digest, prev_snapshot.meetings_digest)
+    return None not in digests and digests == prev_digests
 
 
 def save_service_bodies(db: Session, snapshot: models.Snapshot, bmlt_service_bodies: list[BmltServiceBody]):
+    db_sbs = []
+    db_sbs_by_bmlt_id = {}
     for bmlt_sb in bmlt_service_bodies:
         db_sb = bmlt_sb.to_db(db, snapshot)
         db.add(db_sb)
+        db_sbs.append(db_sb)
+        db_sbs_by_bmlt_id.setdefault(bmlt_sb.id, db_sb)
     db.flush()
 
-    for bmlt_sb in bmlt_service_bodies:
+    # parents are resolved from the freshly flushed objects, and the resulting updates
+    # are sent as a single executemany on the next flush
+    for bmlt_sb, db_sb in zip(bmlt_service_bodies, db_sbs):
         if bmlt_sb.parent_id:
-            db_sb_parent = (
-                db.query(models.ServiceBody)
-                  .filter(models.ServiceBody.snapshot_id == snapshot.id, models.ServiceBody.bmlt_id == bmlt_sb.parent_id)
-                  .first()
-            )
+            db_sb_parent = db_sbs_by_bmlt_id.get(bmlt_sb.parent_id)
             if db_sb_parent:
-                (db.query(models.ServiceBody)
-                   .filter(models.ServiceBody.snapshot_id == snapshot.id, models.ServiceBody.bmlt_id == bmlt_sb.id)
-                   .update({models.ServiceBody.parent_id: db_sb_parent.id}))
+                db_sb.parent_id = db_sb_parent.id
     db.flush()
 
 
@@ -281,20 +338,54 @@ def save_formats(db: Session, snapshot: models.Snapshot, bmlt_formats: list[Bmlt
     db.flush()
 
 
-def save_meetings(db: Session, snapshot: models.Snapshot, bmlt_meetings: list[BmltMeeting]):
+def save_meetings(db: Session, snapshot: models.Snapshot, bmlt_meetings: Iterable[BmltMeeting], batch_size: int = 1000) -> int:
     cache = SnapshotCache(db, snapshot)
+    num_meetings = 0
+    batch = []
     for bmlt_meeting in bmlt_meetings:
-        db_meeting, db_meeting_formats = bmlt_meeting.to_db(db, cache)
-        db.add(db_meeting)
-        db.add_all(db_meeting_formats)
-    db.flush()
+        batch.append(bmlt_meeting)
+        if len(batch) == batch_size:
+            num_meetings += insert_meetings(db, cache, batch)
+            batch = []
+    if batch:
+        num_meetings += insert_meetings(db, cache, batch)
+    return num_meetings
+
+
+def insert_meetings(db: Session, cache: SnapshotCache, bmlt_meetings: list[BmltMeeting]) -> int:
+    # This bypasses the unit of work entirely: the meetings go in as one executemany, their
+    # generated ids come back in one select, and the format associations go in as a second
+    # executemany.
+    snapshot_id = cache.snapshot.id
+    db.execute(insert(models.Meeting.__table__), [m.to_db_values(cache) for m in bmlt_meetings])
+
+    # A root server can return the same bmlt_id more than once, and every row is kept. Ids are
+    # generated in insertion order, so a bmlt_id's rows from this batch are its last ones, in order.
+    num_rows = Counter(m.id_bigint for m in bmlt_meetings)
+    ids_by_bmlt_id = defaultdict(list)
+    query = db.query(models.Meeting.bmlt_id, models.Meeting.id)
+    query = query.filter(models.Meeting.snapshot_id == snapshot_id, models.Meeting.bmlt_id.in_(list(num_rows)))
+    for bmlt_id, meeting_id in query.order_by(models.Meeting.id):
+        ids_by_bmlt_id[bmlt_id].append(meeting_id)
+    meeting_ids = {bmlt_id: deque(ids[-num_rows[bmlt_id]:]) for bmlt_id, ids in ids_by_bmlt_id.items()}
+
+    meeting_format_rows = []
+    for bmlt_meeting in bmlt_meetings:
+        meeting_id = meeting_ids[bmlt_meeting.id_bigint].popleft()
+        for db_format in cache.get_formats(bmlt_meeting.format_shared_id_list):
+            meeting_format_rows.append({"meeting_id": meeting_id, "format_id": db_format.id})
+    if meeting_format_rows:
+        db.execute(insert(models.MeetingFormat.__table__), meeting_format_rows)
+
+    return len(bmlt_meetings)
 
 
-def update_meetings_last_changed(db: Session, snapshot: models.Snapshot, prev_snapshot: models.Snapshot):
+def update_meetings_last_changed(db: Session, snapshot: models.Snapshot, prev_snapshot: models.Snapshot) -> list[structs.MeetingEvent]:
     meetings_by_bmlt_id = {db_m.bmlt_id: db_m for db_m in crud.get_meetings_for_snapshot(db, snapshot.id)}
-    prev_meetings_by_bmlt_id = {db_m.bmlt_id: db_m for db_m in crud.get_meetings_for_snapshot(db, prev_snapshot.id)}
+    prev_meetings_by_bmlt_id = {db_m.bmlt_id: db_m for db_m in crud.get_meetings_for_snapshot(db, prev_snapshot.data_id)}
 
-    for event in diff_snapshots(db, prev_snapshot.id, snapshot.id):
+    events = diff_snapshots(db, prev_snapshot.id, snapshot.id)
+    for event in events:
         if event.event_type != structs.MeetingEventType.MEETING_DELETED:
             db_meeting = meetings_by_bmlt_id[event.new_meeting.bmlt_id]
             db_meeting.last_changed = snapshot.created_at
@@ -307,3 +398,31 @@ def update_meetings_last_changed(db: Session, snapshot: models.Snapshot, prev_sn
             db.add(db_meeting)
 
     db.flush()
+    return events
+
+
+def replace_meeting_events(db: Session, snapshot: models.Snapshot, prev_snapshot: models.Snapshot) -> list[structs.MeetingEvent]:
+    # (re)records the snapshot's meeting events as the diff against prev_snapshot. The diff must
+    # not be composed from the events being replaced, so it is always done in the database.
+    crud.delete_meeting_events(db, snapshot.id)
+    events = diff_snapshots(db, prev_snapshot.id, snapshot.id, strategy=DiffStrategy.SQL)
+    save_meeting_events(db, snapshot, events)
+    snapshot.prev_snapshot_id = prev_snapshot.id
+    db.add(snapshot)
+    db.flush()
+    return events
+
+
+def save_meeting_events(db: Session, snapshot: models.Snapshot, events: list[structs.MeetingEvent]):
+    rows = []
+    for event in events:
+        meeting = event.new_meeting or event.old_meeting
+        rows.append({
+            "snapshot_id": snapshot.id,
+            "root_server_id": snapshot.root_server_id,
+            "bmlt_id": meeting.bmlt_id,
+            "event_type": event.event_type.value,
+            "changed_fields": ",".join(event.changed_fields),
+        })
+    if rows:
+        db.execute(insert(models.MeetingEvent.__table__), rows)
@@ -0,0 +1,112 @@
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+from dijon.settings import settings
+from dijon.snapshot import export
+
+
+logger = logging.getLogger(__name__)
+
+
+# A snapshot's rows would all go in one statement through the foreign keys' ON DELETE CASCADE,
+# which holds locks on every one of them until the transaction ends. Instead they're deleted a
+# batch of ids at a time, children before parents so that the cascades have nothing left to do,
+# and the snapshot row itself goes last. The snapshot is unlinked from its date before the first
+# batch, so that a read can't see it half deleted. With commit set, each batch is its own
+# transaction, and progress is called with the table and the number of rows deleted from it
+# after each batch.
+def delete_snapshot(
+    db: Session,
+    snapshot: models.Snapshot,
+    batch_size: Optional[int] = None,
+    commit: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> dict[str, int]:
+    batch_size = batch_size or settings.get("DELETE_BATCH_SIZE", 1000)
+    snapshot_id = snapshot.id
+    counts = {}
+
+    def deleted(table: str, num_rows: int):
+        counts[table] = counts.get(table, 0) + num_rows
+        if progress:
+            progress(table, num_rows)
+
+    crud.unlink_snapshot(db, snapshot)
+    _end_batch(db, commit)
+
+    meetings = models.Meeting.__table__
+    meeting_formats = models.MeetingFormat.__table__
+    for ids in _iter_id_batches(db, meetings, snapshot_id, batch_size, commit):
+        deleted(meeting_formats.name, db.execute(delete(meeting_formats).where(meeting_formats.c.meeting_id.in_(ids))).rowcount)
+        deleted(meetings.name, db.execute(delete(meetings).where(meetings.c.id.in_(ids))).rowcount)
+
+    for model in (models.MeetingEvent, models.ServiceBody, models.Format):
+        table = model.__table__
+        for ids in _iter_id_batches(db, table, snapshot_id, batch_size, commit):
+            deleted(table.name, db.execute(delete(table).where(table.c.id.in_(ids))).rowcount)
+
+    # through the orm, so that the snapshot dates are kept up to date
+    db.delete(snapshot)
+    _end_batch(db, commit)
+    deleted(models.Snapshot.__tablename__, 1)
+    export.delete_exports(snapshot_id)
+    logger.info(f"deleted snapshot {snapshot_id}: {counts}")
+    return counts
+
+
+# Deletes the root server's snapshots one at a time with delete_snapshot before the root server
+# itself, whose remaining rows (naws codes, snapshot dates) are few enough to cascade. The root
+# server is marked for deletion first, unless the API already has, so that it is hidden and no
+# snapshot is taken of it while its snapshots are going, and a deletion that is interrupted part
+# of the way through is picked up again by the next delete-root-server run.
+def delete_root_server(
+    db: Session,
+    root_server: models.RootServer,
+    batch_size: Optional[int] = None,
+    commit: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> dict[str, int]:
+    root_server_id = root_server.id
+    crud.mark_root_server_for_deletion(db, root_server_id)
+    _end_batch(db, commit)
+
+    counts = {}
+    # aliases go before the snapshots they are aliases of, whose deletion would cascade to them
+    for snapshot in sorted(crud.get_snapshots(db, root_server_id), key=lambda s: s.alias_of_id is None):
+        add_counts(counts, delete_snapshot(db, snapshot, batch_size=batch_size, commit=commit, progress=progress))
+
+    crud.delete_root_server(db, root_server_id)
+    _end_batch(db, commit)
+    add_counts(counts, {models.RootServer.__tablename__: 1})
+    if progress:
+        progress(models.RootServer.__tablename__, 1)
+    logger.info(f"deleted root server {root_server_id}: {counts}")
+    return counts
+
+
+def add_counts(counts: dict[str, int], other: dict[str, int]):
+    for table, num_rows in other.items():
+        counts[table] = counts.get(table, 0) + num_rows
+
+
+def _iter_id_batches(db: Session, table, snapshot_id: int, batch_size: int, commit: bool):
+    # yields the ids of the snapshot's rows in table a batch at a time, ending each batch once
+    # the caller has deleted it
+    while True:
+        query = select(table.c.id).where(table.c.snapshot_id == snapshot_id).order_by(table.c.id).limit(batch_size)
+        ids = db.execute(query).scalars().all()
+        if not ids:
+            return
+        yield ids
+        _end_batch(db, commit)
+
+
+def _end_batch(db: Session, commit: bool):
+    if commit:
+        db.commit()
+    else:
+        db.flush()
@@ -1,23 +1,25 @@
 import dataclasses
+from enum import Enum
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
 from dijon import crud, models
+from dijon.settings import settings
 from dijon.snapshot import structs
 from dijon.snapshot.cache import NawsCodeCache
 
 
+# the number of bmlt_ids bound into a single IN clause when loading changed meetings
+DIFF_BATCH_SIZE = 500
+
+
 class Data:
     def __init__(self, old: list[models.Meeting], new: list[models.Meeting], naws_code_cache: NawsCodeCache, exclude_world_id_updates: bool = False):
         self.old_db_meetings = old
         self.new_db_meetings = new
         self.old_db_meetings_by_id = {m.bmlt_id: m for m in self.old_db_meetings}
         self.new_db_meetings_by_id = {m.bmlt_id: m for m in self.new_db_meetings}
-        self.old_diff_meetings = structs.DiffableMeeting.from_db_obj_list(self.old_db_meetings)
-        self.new_diff_meetings = structs.DiffableMeeting.from_db_obj_list(self.new_db_meetings)
-        self.old_diff_meetings_by_id = {m.bmlt_id: m for m in self.old_diff_meetings}
-        self.new_diff_meetings_by_id = {m.bmlt_id: m for m in self.new_diff_meetings}
         self.cache: NawsCodeCache = naws_code_cache
         self.exclude_world_id_updates = exclude_world_id_updates
 
@@ -31,9 +33,8 @@ class Data:
 
     def get_created_events(self):
         created_events = []
-        for diff_meeting in self.new_diff_meetings:
-            if diff_meeting.bmlt_id not in self.old_diff_meetings_by_id:
-                db_meeting = self.new_db_meetings_by_id[diff_meeting.bmlt_id]
+        for db_meeting in self.new_db_meetings:
+            if db_meeting.bmlt_id not in self.old_db_meetings_by_id:
                 meeting = structs.Meeting.from_db_obj(db_meeting, self.cache)
                 event = self.create_created_event(meeting)
                 created_events.append(event)
@@ -49,9 +50,8 @@ class Data:
 
     def get_deleted_events(self):
         deleted_events = []
-        for diff_meeting in self.old_diff_meetings:
-            if diff_meeting.bmlt_id not in self.new_diff_meetings_by_id:
-                db_meeting = self.old_db_meetings_by_id[diff_meeting.bmlt_id]
+        for db_meeting in self.old_db_meetings:
+            if db_meeting.bmlt_id not in self.new_db_meetings_by_id:
                 meeting = structs.Meeting.from_db_obj(db_meeting, self.cache)
                 event = self.create_deleted_event(meeting)
                 deleted_events.append(event)
@@ -72,22 +72,28 @@ class Data:
                 changed_fields.append(field.name)
         return changed_fields
 
+    def is_unchanged(self, old_db_meeting: models.Meeting, new_db_meeting: models.Meeting) -> bool:
+        # Fingerprints are compared straight off the db rows, so only meetings that look
+        # different pay for full DiffableMeeting validation and a field-by-field comparison.
+        return structs.get_meeting_fingerprint(old_db_meeting) == structs.get_meeting_fingerprint(new_db_meeting)
+
     def get_updated_events(self):
         updated_events = []
-        for diff_meeting in self.old_diff_meetings:
-            if diff_meeting.bmlt_id in self.new_diff_meetings_by_id:
-                new_diff_meeting = self.new_diff_meetings_by_id[diff_meeting.bmlt_id]
-                if diff_meeting != new_diff_meeting:
-                    changed_fields = self.get_changed_fields(diff_meeting, new_diff_meeting)
-                    if self.exclude_world_id_updates:
-                        if len(changed_fields) == 1 and changed_fields[0] == "world_id":
-                            continue
-                    db_meeting = self.old_db_meetings_by_id[diff_meeting.bmlt_id]
-                    new_db_meeting = self.new_db_meetings_by_id[new_diff_meeting.bmlt_id]
-                    meeting = structs.Meeting.from_db_obj(db_meeting, self.cache)
-                    new_meeting = structs.Meeting.from_db_obj(new_db_meeting, self.cache)
-                    event = self.create_updated_event(meeting, new_meeting, changed_fields)
-                    updated_events.append(event)
+        for db_meeting in self.old_db_meetings:
+            new_db_meeting = self.new_db_meetings_by_id.get(db_meeting.bmlt_id)
+            if new_db_meeting is None or self.is_unchanged(db_meeting, new_db_meeting):
+                continue
+            diff_meeting = structs.DiffableMeeting.from_db_obj(db_meeting)
+            new_diff_meeting = structs.DiffableMeeting.from_db_obj(new_db_meeting)
+            if diff_meeting != new_diff_meeting:
+                changed_fields = self.get_changed_fields(diff_meeting, new_diff_meeting)
+                if self.exclude_world_id_updates:
+                    if len(changed_fields) == 1 and changed_fields[0] == "world_id":
+                        continue
+                meeting = structs.Meeting.from_db_obj(db_meeting, self.cache)
+                new_meeting = structs.Meeting.from_db_obj(new_db_meeting, self.cache)
+                event = self.create_updated_event(meeting, new_meeting, changed_fields)
+                updated_events.append(event)
         return updated_events
 
     def diff(self) -> list[structs.MeetingEvent]:
@@ -97,9 +103,31 @@ class Data:
         return events
 
 
-def diff_snapshots(db: Session, old_snapshot_id: int, new_snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None, exclude_world_id_updates: bool = False) -> list[structs.MeetingEvent]:
-    snap = crud.get_snapshot_by_id(db, old_snapshot_id)
-    cache = NawsCodeCache(db, snap.root_server)
+class DiffStrategy(str, Enum):
+    # memory loads both snapshots and compares every meeting in python, sql asks the
+    # database which meetings changed and only loads those, and events only loads the
+    # meetings named by the meeting events recorded in between, falling back to sql when
+    # any of them are missing
+    MEMORY = "memory"
+    SQL = "sql"
+    EVENTS = "events"
+
+
+def diff_snapshots(
+    db: Session,
+    old_snapshot_id: int,
+    new_snapshot_id: int,
+    service_body_bmlt_ids: Optional[list[int]] = None,
+    exclude_world_id_updates: bool = False,
+    strategy: Optional[DiffStrategy] = None,
+) -> list[structs.MeetingEvent]:
+    old_snapshot = crud.get_snapshot_by_id(db, old_snapshot_id)
+    new_snapshot = crud.get_snapshot_by_id(db, new_snapshot_id)
+    cache = NawsCodeCache(db, old_snapshot.root_server)
+    old_snapshot_id = old_snapshot.data_id
+    new_snapshot_id = new_snapshot.data_id
+    if old_snapshot_id == new_snapshot_id:
+        return []
     if service_body_bmlt_ids is not None:
         unique = set()
         for bmlt_id in crud.get_child_service_body_bmlt_ids(db, old_snapshot_id, service_body_bmlt_ids):
@@ -107,7 +135,47 @@ def diff_snapshots(db: Session, old_snapshot_id: int, new_snapshot_id: int, serv
         for bmlt_id in crud.get_child_service_body_bmlt_ids(db, new_snapshot_id, service_body_bmlt_ids):
             unique.add(bmlt_id)
         service_body_bmlt_ids = list(unique)
-    old = crud.get_meetings_for_snapshot(db, old_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids)
-    new = crud.get_meetings_for_snapshot(db, new_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids)
+    strategy = DiffStrategy(strategy or settings.get("DIFF_STRATEGY", DiffStrategy.EVENTS))
+    bmlt_ids = None
+    if strategy == DiffStrategy.EVENTS:
+        bmlt_ids = get_event_bmlt_ids(db, old_snapshot, new_snapshot)
+        if bmlt_ids is None:
+            strategy = DiffStrategy.SQL
+    if strategy == DiffStrategy.SQL:
+        bmlt_ids = crud.get_changed_meeting_bmlt_ids(db, old_snapshot_id, new_snapshot_id)
+    if bmlt_ids is not None:
+        # Meetings that are identical in both snapshots never produce an event, whether or not
+        # they pass the service body filter, so the diff of just the changed meetings is the same.
+        old = []
+        new = []
+        for i in range(0, len(bmlt_ids), DIFF_BATCH_SIZE):
+            batch = bmlt_ids[i:i + DIFF_BATCH_SIZE]
+            old.extend(crud.get_meetings_for_snapshot(db, old_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids, bmlt_ids=batch))
+            new.extend(crud.get_meetings_for_snapshot(db, new_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids, bmlt_ids=batch))
+        # keep the events in the same order as a full diff
+        old.sort(key=lambda m: m.id)
+        new.sort(key=lambda m: m.id)
+    else:
+        old = crud.get_meetings_for_snapshot(db, old_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids)
+        new = crud.get_meetings_for_snapshot(db, new_snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids)
     data = Data(old, new, cache, exclude_world_id_updates=exclude_world_id_updates)
     return data.diff()
+
+
+def get_event_bmlt_ids(db: Session, old_snapshot: models.Snapshot, new_snapshot: models.Snapshot) -> Optional[list[int]]:
+    # Each snapshot's meeting events are the diff against the snapshot it was ingested after, so
+    # following those links back from the new snapshot to the old one and collecting the bmlt_ids
+    # of their events gives every meeting that could differ between the two. Returns None when
+    # the chain is broken, e.g. a snapshot's events were never recorded.
+    snapshots = crud.get_snapshots_between(db, old_snapshot.root_server_id, old_snapshot.created_at, new_snapshot.created_at)
+    snapshots_by_id = {s.id: s for s in snapshots}
+    snapshot_ids = []
+    snapshot = new_snapshot
+    while snapshot.id != old_snapshot.id:
+        snapshot_ids.append(snapshot.id)
+        if snapshot.prev_snapshot_id == old_snapshot.id:
+            break
+        snapshot = snapshots_by_id.get(snapshot.prev_snapshot_id)
+        if snapshot is None or len(snapshot_ids) > len(snapshots):
+            return None
+    return crud.get_meeting_event_bmlt_ids(db, snapshot_ids)
@@ -0,0 +1,186 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+from dijon.settings import settings
+from dijon.snapshot import serialize
+from dijon.snapshot.cache import EmptyNawsCodeCache, NawsCodeCache
+from dijon.utils import json_util
+
+
+logger = logging.getLogger(__name__)
+
+MEETINGS = "meetings"
+FORMATS = "formats"
+SERVICE_BODIES = "service_bodies"
+
+
+# Snapshots are rendered to json once, after ingest, without any naws code overrides. Reads then
+# either send the gzipped file as is or, when the root server has naws codes or the request is
+# filtered, apply those to the parsed json, which is far cheaper than building the structs.
+# Exports are only written when EXPORT_DIR is set.
+def get_export_dir() -> Optional[str]:
+    return settings.get("EXPORT_DIR", None)
+
+
+def get_export_path(snapshot_id: int, name: str, gzipped: bool = False) -> Optional[str]:
+    export_dir = get_export_dir()
+    if not export_dir:
+        return None
+    filename = f"{name}.json.gz" if gzipped else f"{name}.json"
+    return os.path.join(export_dir, str(snapshot_id), filename)
+
+
+def write_exports(db: Session, snap: models.Snapshot):
+    # Called once the snapshot is committed, so that a failed ingest leaves no files behind and
+    # its transaction isn't held open while they're written. Meetings are rendered a batch at a
+    # time and streamed to disk, so memory use doesn't grow with the size of the root server.
+    if not get_export_dir() or snap.alias_of_id:
+        return
+    cache = EmptyNawsCodeCache()
+    db_meetings = crud.iter_meetings_for_snapshot(db, snap.id)
+    _write_export(snap.id, MEETINGS, (serialize.meeting_to_json(m, cache) for m in db_meetings))
+    db_formats = crud.get_formats_for_snapshot(db, snap.id)
+    _write_export(snap.id, FORMATS, serialize.formats_to_json(db_formats, cache))
+    db_service_bodies = crud.get_service_bodies_for_snapshot(db, snap.id)
+    _write_export(snap.id, SERVICE_BODIES, serialize.service_bodies_to_json(db_service_bodies, cache))
+    logger.info(f"wrote exports for snapshot {snap.id}")
+
+
+def _write_export(snapshot_id: int, name: str, items: Iterable[Any]):
+    path = get_export_path(snapshot_id, name)
+    gzip_path = get_export_path(snapshot_id, name, gzipped=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # both files are written in the one pass, each to a temporary file that is renamed once it is
+    # complete, so that readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    gzip_fd, gzip_tmp_path = tempfile.mkstemp(dir=os.path.dirname(gzip_path))
+    try:
+        with os.fdopen(fd, "wb") as f, os.fdopen(gzip_fd, "wb") as gzip_f, gzip.GzipFile(fileobj=gzip_f, mode="wb") as gz:
+            for chunk in json_util.iter_render(items):
+                f.write(chunk)
+                gz.write(chunk)
+        os.replace(tmp_path, path)
+        os.replace(gzip_tmp_path, gzip_path)
+    except:  # noqa: E722
+        for tmp in (tmp_path, gzip_tmp_path):
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        raise
+
+
+def delete_exports(snapshot_id: int):
+    export_dir = get_export_dir()
+    if export_dir:
+        shutil.rmtree(os.path.join(export_dir, str(snapshot_id)), ignore_errors=True)
+
+
+def read_export(snapshot_id: int, name: str) -> Optional[bytes]:
+    path = get_export_path(snapshot_id, name)
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def open_export(path: str, chunk_size: int = 64 * 1024) -> Optional[tuple[Iterator[bytes], int]]:
+    # the file's chunks and size, both from the one open file, so that an export rewritten or
+    # deleted in the meantime can't make them disagree
+    try:
+        fp = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    size = os.fstat(fp.fileno()).st_size
+
+    def iter_chunks() -> Iterator[bytes]:
+        with fp:
+            yield from iter(lambda: fp.read(chunk_size), b"")
+    return iter_chunks(), size
+
+
+def get_meetings_json(db: Session, snap: models.Snapshot, cache: NawsCodeCache, service_body_bmlt_ids: Optional[list[int]] = None) -> Optional[bytes]:
+    content = read_export(snap.data_id, MEETINGS)
+    if content is None:
+        return None
+    if service_body_bmlt_ids is None and not _has_naws_codes(cache):
+        return content
+    meetings = json.loads(content)
+    if service_body_bmlt_ids is not None:
+        sb_ids = set(crud.get_child_service_body_bmlt_ids(db, snap.data_id, service_body_bmlt_ids))
+        meetings = [m for m in meetings if m["service_body_bmlt_id"] in sb_ids]
+    for meeting in meetings:
+        _apply_naws_code(meeting, cache.get_meeting_naws_code(meeting["bmlt_id"]))
+        if meeting["service_body"] is not None:
+            _apply_service_body_naws_code(meeting["service_body"], cache)
+        for format in meeting["formats"]:
+            _apply_format_naws_code(format, cache)
+    return json_util.render(meetings)
+
+
+def get_formats_json(snap: models.Snapshot, cache: NawsCodeCache) -> Optional[bytes]:
+    content = read_export(snap.data_id, FORMATS)
+    if content is None or not cache.format_naws_codes:
+        return content
+    formats = json.loads(content)
+    for format in formats:
+        _apply_format_naws_code(format, cache)
+    return json_util.render(formats)
+
+
+def get_service_bodies_json(snap: models.Snapshot, cache: NawsCodeCache) -> Optional[bytes]:
+    content = read_export(snap.data_id, SERVICE_BODIES)
+    if content is None or not cache.service_body_naws_codes:
+        return content
+    service_bodies = json.loads(content)
+    for service_body in service_bodies:
+        _apply_service_body_naws_code(service_body, cache)
+    return json_util.render(service_bodies)
+
+
+def get_servable_export_path(snap: models.Snapshot, cache: NawsCodeCache, name: str) -> Optional[str]:
+    # the gzipped export, if it is exactly the unfiltered response and can be sent as is
+    path = get_export_path(snap.data_id, name, gzipped=True)
+    if not path or not os.path.exists(path):
+        return None
+    naws_codes = {
+        MEETINGS: _has_naws_codes(cache),
+        FORMATS: bool(cache.format_naws_codes),
+        SERVICE_BODIES: bool(cache.service_body_naws_codes),
+    }[name]
+    return None if naws_codes else path
+
+
+def _has_naws_codes(cache: NawsCodeCache) -> bool:
+    # meetings embed their service body and formats, so any kind of naws code changes them
+    return bool(cache.meeting_naws_codes or cache.service_body_naws_codes or cache.format_naws_codes)
+
+
+def _apply_service_body_naws_code(service_body: dict[str, Any], cache: NawsCodeCache):
+    _apply_naws_code(service_body, cache.get_service_body_naws_code(service_body["bmlt_id"]))
+
+
+def _apply_format_naws_code(format: dict[str, Any], cache: NawsCodeCache):
+    _apply_naws_code(format, cache.get_format_naws_code(format["bmlt_id"]))
+
+
+def _apply_naws_code(item: dict[str, Any], naws_code):
+    item["naws_code_override"] = naws_code.code if naws_code else None
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for value in (accept_encoding or "").split(","):
+        coding, _, params = value.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            return not (q.startswith("q=") and float(q[2:] or 0) == 0)
+    return False
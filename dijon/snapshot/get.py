@@ -1,31 +1,108 @@
-from typing import Optional
+from typing import Iterator, Optional
 
 from sqlalchemy.orm import Session
 
-from dijon import crud
-from dijon.snapshot import structs
+from dijon import crud, models
+from dijon.settings import settings
+from dijon.snapshot import export, serialize, structs
 from dijon.snapshot.cache import NawsCodeCache
+from dijon.utils import json_util
+from dijon.utils.cache_util import response_cache
 
 
 def get_meetings(db: Session, snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None) -> list[structs.Meeting]:
     snap = crud.get_snapshot_by_id(db, snapshot_id)
     cache = NawsCodeCache(db, snap.root_server)
+    return structs.Meeting.from_db_obj_list(_get_db_meetings(db, snap, service_body_bmlt_ids), cache)
+
+
+def _get_db_meetings(db: Session, snap: models.Snapshot, service_body_bmlt_ids: Optional[list[int]] = None) -> list[models.Meeting]:
     if service_body_bmlt_ids is not None:
-        unique = {sb_id for sb_id in crud.get_child_service_body_bmlt_ids(db, snapshot_id, service_body_bmlt_ids)}
+        unique = {sb_id for sb_id in crud.get_child_service_body_bmlt_ids(db, snap.data_id, service_body_bmlt_ids)}
         service_body_bmlt_ids = list(unique)
-    db_meetings = crud.get_meetings_for_snapshot(db, snapshot_id, service_body_bmlt_ids=service_body_bmlt_ids)
-    return structs.Meeting.from_db_obj_list(db_meetings, cache)
+    return crud.get_meetings_for_snapshot(db, snap.data_id, service_body_bmlt_ids=service_body_bmlt_ids)
+
+
+def iter_meetings_ndjson(db: Session, snapshot_id: int, service_body_bmlt_ids: Optional[list[int]] = None) -> Iterator[bytes]:
+    # the same meetings as get_meetings, one json document per line, built a batch at a time
+    snap = crud.get_snapshot_by_id(db, snapshot_id)
+    cache = NawsCodeCache(db, snap.root_server)
+    if service_body_bmlt_ids is not None:
+        service_body_bmlt_ids = list(set(crud.get_child_service_body_bmlt_ids(db, snap.data_id, service_body_bmlt_ids)))
+    batch_size = settings.get("STREAM_BATCH_SIZE", 1000)
+    for db_meeting in crud.iter_meetings_for_snapshot(db, snap.data_id, service_body_bmlt_ids=service_body_bmlt_ids, batch_size=batch_size):
+        yield json_util.render(serialize.meeting_to_json(db_meeting, cache)) + b"\n"
 
 
 def get_formats(db: Session, snapshot_id: int) -> list[structs.Format]:
     snap = crud.get_snapshot_by_id(db, snapshot_id)
     cache = NawsCodeCache(db, snap.root_server)
-    db_formats = crud.get_formats_for_snapshot(db, snapshot_id)
+    db_formats = crud.get_formats_for_snapshot(db, snap.data_id)
     return structs.Format.from_db_obj_list(db_formats, cache)
 
 
 def get_service_bodies(db: Session, snapshot_id: int) -> list[structs.ServiceBody]:
     snap = crud.get_snapshot_by_id(db, snapshot_id)
     cache = NawsCodeCache(db, snap.root_server)
-    db_service_bodies = crud.get_service_bodies_for_snapshot(db, snapshot_id)
+    db_service_bodies = crud.get_service_bodies_for_snapshot(db, snap.data_id)
     return structs.ServiceBody.from_db_obj_list(db_service_bodies, cache)
+
+
+# The *_json functions return the serialized response for a snapshot, from the response cache
+# when possible. The *_key functions identify that response: they use the snapshot's data_id so
+# that aliased snapshots share entries, and the root server's cache versions so that any change
+# to its naws codes, or any rewrite of its snapshot data, produces a new key. On a miss the
+# response is rendered from the snapshot's export if it has one, or else from the db without
+# building the structs.
+def get_meetings_key(db: Session, snap: models.Snapshot, service_body_bmlt_ids: Optional[list[int]] = None) -> tuple:
+    sb_filter = tuple(sorted(set(service_body_bmlt_ids))) if service_body_bmlt_ids is not None else None
+    return ("meetings", snap.data_id, *crud.get_cache_versions(db, snap.root_server_id), sb_filter)
+
+
+def get_formats_key(db: Session, snap: models.Snapshot) -> tuple:
+    return ("formats", snap.data_id, *crud.get_cache_versions(db, snap.root_server_id))
+
+
+def get_service_bodies_key(db: Session, snap: models.Snapshot) -> tuple:
+    return ("service_bodies", snap.data_id, *crud.get_cache_versions(db, snap.root_server_id))
+
+
+def get_meetings_json(db: Session, snap: models.Snapshot, service_body_bmlt_ids: Optional[list[int]] = None) -> bytes:
+    key = get_meetings_key(db, snap, service_body_bmlt_ids)
+    content = response_cache.get(key)
+    if content is None:
+        cache = NawsCodeCache(db, snap.root_server)
+        content = export.get_meetings_json(db, snap, cache, service_body_bmlt_ids)
+        if content is None:
+            content = json_util.render(serialize.meetings_to_json(_get_db_meetings(db, snap, service_body_bmlt_ids), cache))
+        response_cache.set(key, content)
+    return content
+
+
+def get_formats_json(db: Session, snap: models.Snapshot) -> bytes:
+    key = get_formats_key(db, snap)
+    content = response_cache.get(key)
+    if content is None:
+        cache = NawsCodeCache(db, snap.root_server)
+        content = export.get_formats_json(snap, cache)
+        if content is None:
+            content = json_util.render(serialize.formats_to_json(crud.get_formats_for_snapshot(db, snap.data_id), cache))
+        response_cache.set(key, content)
+    return content
+
+
+def get_service_bodies_json(db: Session, snap: models.Snapshot) -> bytes:
+    key = get_service_bodies_key(db, snap)
+    content = response_cache.get(key)
+    if content is None:
+        cache = NawsCodeCache(db, snap.root_server)
+        content = export.get_service_bodies_json(snap, cache)
+        if content is None:
+            content = json_util.render(serialize.service_bodies_to_json(crud.get_service_bodies_for_snapshot(db, snap.data_id), cache))
+        response_cache.set(key, content)
+    return content
+
+
+def get_export_path(db: Session, snap: models.Snapshot, name: str) -> Optional[str]:
+    # the path of the gzipped export of the unfiltered response, if it can be sent as is
+    return export.get_servable_export_path(snap, NawsCodeCache(db, snap.root_server), name)
@@ -0,0 +1,106 @@
+from datetime import time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional, Union
+
+from pydantic.json import decimal_encoder
+
+from dijon import models
+from dijon.snapshot.cache import NawsCodeCache
+
+
+# The read path renders snapshots straight from the db objects to json types, without building
+# and validating the structs. Each function returns exactly what jsonable_encoder produces for
+# the corresponding struct, with the keys in the struct's field order, so the rendered bytes
+# match the documented response_model. The data was validated when the snapshot was saved.
+def meeting_to_json(db_obj: models.Meeting, cache: NawsCodeCache) -> dict[str, Any]:
+    naws_code = cache.get_meeting_naws_code(db_obj.bmlt_id)
+    return {
+        "bmlt_id": db_obj.bmlt_id,
+        "name": db_obj.name,
+        "day": _encode_enum(db_obj.day),
+        "service_body_bmlt_id": db_obj.service_body.bmlt_id,
+        "venue_type": _encode_enum(db_obj.venue_type),
+        "start_time": _encode_time(db_obj.start_time),
+        "duration": _encode_timedelta(db_obj.duration),
+        "time_zone": db_obj.time_zone,
+        "latitude": _encode_decimal(db_obj.latitude),
+        "longitude": _encode_decimal(db_obj.longitude),
+        "published": db_obj.published,
+        "world_id": db_obj.world_id,
+        "location_text": db_obj.location_text,
+        "location_info": db_obj.location_info,
+        "location_street": db_obj.location_street,
+        "location_city_subsection": db_obj.location_city_subsection,
+        "location_neighborhood": db_obj.location_neighborhood,
+        "location_municipality": db_obj.location_municipality,
+        "location_sub_province": db_obj.location_sub_province,
+        "location_province": db_obj.location_province,
+        "location_postal_code_1": db_obj.location_postal_code_1,
+        "location_nation": db_obj.location_nation,
+        "train_lines": db_obj.train_lines,
+        "bus_lines": db_obj.bus_lines,
+        "comments": db_obj.comments,
+        "virtual_meeting_link": db_obj.virtual_meeting_link,
+        "phone_meeting_number": db_obj.phone_meeting_number,
+        "virtual_meeting_additional_info": db_obj.virtual_meeting_additional_info,
+        "format_bmlt_ids": sorted([mf.format.bmlt_id for mf in db_obj.meeting_formats]),
+        "naws_code_override": naws_code.code if naws_code else None,
+        "service_body": cache.memoize(service_body_to_json, db_obj.service_body) if db_obj.service_body else None,
+        "formats": [cache.memoize(format_to_json, mf.format) for mf in db_obj.meeting_formats],
+        "last_changed": db_obj.last_changed.date().isoformat() if db_obj.last_changed else None,
+    }
+
+
+def service_body_to_json(db_obj: models.ServiceBody, cache: NawsCodeCache) -> dict[str, Any]:
+    naws_code = cache.get_service_body_naws_code(db_obj.bmlt_id)
+    return {
+        "bmlt_id": db_obj.bmlt_id,
+        "parent_bmlt_id": db_obj.parent.bmlt_id if db_obj.parent else None,
+        "name": db_obj.name,
+        "type": db_obj.type,
+        "description": db_obj.description,
+        "url": db_obj.url,
+        "helpline": db_obj.helpline,
+        "world_id": db_obj.world_id,
+        "naws_code_override": naws_code.code if naws_code else None,
+    }
+
+
+def format_to_json(db_obj: models.Format, cache: NawsCodeCache) -> dict[str, Any]:
+    naws_code = cache.get_format_naws_code(db_obj.bmlt_id)
+    return {
+        "bmlt_id": db_obj.bmlt_id,
+        "key_string": db_obj.key_string,
+        "name": db_obj.name,
+        "world_id": db_obj.world_id,
+        "naws_code_override": naws_code.code if naws_code else None,
+    }
+
+
+def meetings_to_json(db_obj_list: list[models.Meeting], cache: NawsCodeCache) -> list[dict[str, Any]]:
+    return [meeting_to_json(m, cache) for m in db_obj_list]
+
+
+def service_bodies_to_json(db_obj_list: list[models.ServiceBody], cache: NawsCodeCache) -> list[dict[str, Any]]:
+    return [service_body_to_json(s, cache) for s in db_obj_list]
+
+
+def formats_to_json(db_obj_list: list[models.Format], cache: NawsCodeCache) -> list[dict[str, Any]]:
+    return [format_to_json(f, cache) for f in db_obj_list]
+
+
+def _encode_enum(value: Enum) -> Any:
+    return value.value
+
+
+def _encode_time(value: time) -> str:
+    return value.isoformat()
+
+
+def _encode_timedelta(value: timedelta) -> float:
+    return value.total_seconds()
+
+
+def _encode_decimal(value: Optional[Decimal]) -> Optional[Union[int, float]]:
+    return decimal_encoder(value) if value is not None else None
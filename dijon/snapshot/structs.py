@@ -1,3 +1,4 @@
+import dataclasses
 from datetime import date, time, timedelta
 from decimal import Decimal
 from enum import Enum
@@ -90,6 +91,19 @@ class DiffableMeeting:
         )
 
 
+# DiffableMeeting fields that are columns of models.Meeting. The others are read through its relationships.
+DIFFABLE_MEETING_COLUMNS = [f.name for f in dataclasses.fields(DiffableMeeting) if f.name not in ("service_body_bmlt_id", "format_bmlt_ids")]
+
+
+def get_meeting_fingerprint(db_obj: models.Meeting) -> tuple:
+    # the raw values of every DiffableMeeting field
+    return (
+        *[getattr(db_obj, name) for name in DIFFABLE_MEETING_COLUMNS],
+        db_obj.service_body.bmlt_id,
+        tuple(sorted(mf.format.bmlt_id for mf in db_obj.meeting_formats)),
+    )
+
+
 @dataclass(config=ORMMode)
 class ServiceBody:
     bmlt_id: int
@@ -191,8 +205,8 @@ class Meeting(DiffableMeeting):
             virtual_meeting_additional_info=db_obj.virtual_meeting_additional_info,
             format_bmlt_ids=sorted([mf.format.bmlt_id for mf in db_obj.meeting_formats]),
             naws_code_override=naws_code.code if naws_code else None,
-            service_body=ServiceBody.from_db_obj(db_obj.service_body, cache) if db_obj.service_body else None,
-            formats=[Format.from_db_obj(mf.format, cache) for mf in db_obj.meeting_formats],
+            service_body=cache.memoize(ServiceBody.from_db_obj, db_obj.service_body) if db_obj.service_body else None,
+            formats=[cache.memoize(Format.from_db_obj, mf.format) for mf in db_obj.meeting_formats],
             last_changed=db_obj.last_changed.date() if db_obj.last_changed else None
         )
 
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+from dijon.snapshot import compact
+from dijon.snapshot.create import BmltMeeting
+from dijon.snapshot.diff import DiffStrategy, diff_snapshots
+from dijon.snapshot.tests.test_create_snapshot import create_snapshot, get_payloads
+
+
+@pytest.fixture
+def root_server(db: Session) -> models.RootServer:
+    return crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+
+
+def test_get_retained_snapshot_ids():
+    today = date(2024, 6, 30)
+    snapshots = [SimpleNamespace(id=i, created_at=datetime(2022, 1, 1, 12) + timedelta(days=i)) for i in range((today - date(2022, 1, 1)).days + 1)]
+    retained = [s for s in snapshots if s.id in compact.get_retained_snapshot_ids(snapshots, today, 90, 365)]
+    ages = [(today - s.created_at.date()).days for s in retained]
+
+    # every day for 90 days, then the last day of each week, then the last day of each month
+    assert [a for a in ages if a < 90] == list(range(89, -1, -1))
+    weekly = [s.created_at.date() for s in retained if 90 <= (today - s.created_at.date()).days < 365]
+    assert all(d.isoweekday() == 7 for d in weekly[:-1])
+    monthly = [s.created_at.date() for s in retained if (today - s.created_at.date()).days >= 365]
+    assert all((d + timedelta(days=1)).day == 1 for d in monthly[:-1])
+    assert len(monthly) == 19
+    assert compact.get_retained_snapshot_ids([], today, 90, 365) == set()
+
+
+def set_meeting_name(payloads: dict, bmlt_id: int, name: str) -> dict:
+    for meeting in payloads[BmltMeeting.get_url("https://blah/main_server/")]:
+        if meeting["id_bigint"] == str(bmlt_id):
+            meeting["meeting_name"] = name
+    return payloads
+
+
+def create_snapshots(db: Session, root_server: models.RootServer) -> list[models.Snapshot]:
+    payloads = get_payloads()
+    snap_0 = create_snapshot(db, root_server, payloads)
+    snap_1 = create_snapshot(db, root_server, set_meeting_name(payloads, 1, "renamed 1"))
+    snap_2 = create_snapshot(db, root_server, set_meeting_name(payloads, 3, "renamed 3"))
+    snap_3 = create_snapshot(db, root_server, payloads)
+    snap_4 = create_snapshot(db, root_server, set_meeting_name(payloads, 2, "renamed 2"))
+    assert snap_3.alias_of_id == snap_2.id
+    # week 1, then three days of week 2, then week 3
+    snapshots = [snap_0, snap_1, snap_2, snap_3, snap_4]
+    for snap, day in zip(snapshots, (3, 10, 11, 12, 20)):
+        snap.created_at = datetime(2024, 1, day, 12)
+        db.add(snap)
+    db.flush()
+    return snapshots
+
+
+def test_compact_snapshots(db: Session, root_server: models.RootServer):
+    snap_0, snap_1, snap_2, snap_3, snap_4 = create_snapshots(db, root_server)
+    last_changed = {m.bmlt_id: m.last_changed for m in crud.get_meetings_for_snapshot(db, snap_4.id)}
+
+    counts = compact.compact_snapshots(db, root_server, date(2024, 1, 20), daily_days=5, weekly_days=365, dry_run=True)
+    assert counts == {"snapshots": 1}
+    assert len(crud.get_snapshots(db, root_server.id)) == 5
+
+    # snap_3 is the last of its week, and keeps snap_2 which it is an alias of
+    counts = compact.compact_snapshots(db, root_server, date(2024, 1, 20), daily_days=5, weekly_days=365, batch_size=2)
+    assert counts == {"meeting_formats": 10, "meetings": 5, "meeting_events": 1, "service_bodies": 2, "formats": 2, "snapshots": 1}
+    assert [s.id for s in crud.get_snapshots(db, root_server.id)] == [snap_0.id, snap_2.id, snap_3.id, snap_4.id]
+    assert crud.get_meetings_for_snapshot(db, snap_1.id) == []
+    assert crud.get_snapshot_by_date(db, root_server.id, date(2024, 1, 10)) is None
+    assert crud.get_snapshot_by_date(db, root_server.id, date(2024, 1, 12)) == snap_3
+
+    # snap_2's events now cover the change made in the deleted snap_1
+    db.refresh(snap_2)
+    assert snap_2.prev_snapshot_id == snap_0.id
+    assert sorted(crud.get_meeting_event_bmlt_ids(db, [snap_2.id])) == [1, 3]
+    events = diff_snapshots(db, snap_0.id, snap_4.id, strategy=DiffStrategy.EVENTS)
+    assert events == diff_snapshots(db, snap_0.id, snap_4.id, strategy=DiffStrategy.SQL)
+    assert sorted(e.new_meeting.bmlt_id for e in events) == [1, 2, 3]
+    assert {m.bmlt_id: m.last_changed for m in crud.get_meetings_for_snapshot(db, snap_4.id)} == last_changed
+
+    # nothing more to delete
+    assert compact.compact_snapshots(db, root_server, date(2024, 1, 20), daily_days=5, weekly_days=365) == {"snapshots": 0}
@@ -20,6 +20,7 @@ from dijon.models import (
 )
 from dijon.snapshot.create import (
     BmltMeeting,
+    BmltServiceBody,
     SnapshotCache,
     save_meetings,
     update_meetings_last_changed,
@@ -1117,6 +1118,47 @@ def test_bmlt_meeting_to_db_meeting_formats(db: Session, cache: SnapshotCache, s
     assert db_meeting.meeting_formats[1].format == db_format_2
 
 
+def test_snapshot_cache_get_formats(db: Session, cache: SnapshotCache):
+    db_format_1 = crud.create_format(db, cache.snapshot.id, 1, "O")
+    db_format_2 = crud.create_format(db, cache.snapshot.id, 2, "BEG")
+
+    assert cache.get_formats([2, 3, 1, 2]) == [db_format_1, db_format_2]
+    assert cache.get_formats([]) == []
+
+    # the formats are loaded once per snapshot
+    crud.create_format(db, cache.snapshot.id, 3, "C")
+    assert cache.get_formats([3]) == []
+    cache.clear()
+    assert [f.bmlt_id for f in cache.get_formats([3])] == [3]
+
+
+def test_snapshot_cache_get_formats_duplicate_bmlt_ids(db: Session, cache: SnapshotCache):
+    db_format_1 = crud.create_format(db, cache.snapshot.id, 1, "O")
+    db_format_2 = crud.create_format(db, cache.snapshot.id, 1, "O2")
+    db_format_3 = crud.create_format(db, cache.snapshot.id, 2, "BEG")
+
+    # every format row with a matching bmlt_id is linked, as get_formats_by_bmlt_ids does
+    assert cache.get_formats([2, 1]) == [db_format_1, db_format_2, db_format_3]
+    assert sorted(cache.get_formats([1]), key=lambda f: f.id) == crud.get_formats_by_bmlt_ids(db, cache.snapshot.id, [1])
+
+
+def test_bmlt_meeting_from_json():
+    raw_meeting_1 = get_mock_raw_meeting()
+    raw_meeting_1["service_body_bigint"] = "1"
+    raw_meeting_2 = get_mock_raw_meeting()
+    raw_meeting_2["service_body_bigint"] = "2"
+    raw_meeting_3 = get_mock_raw_meeting()
+    raw_meeting_3["meeting_name"] = ""
+    raw_meetings = [raw_meeting_1, raw_meeting_2, raw_meeting_3]
+
+    bmlt_meetings = list(BmltMeeting.from_json(raw_meetings))
+    assert [m.service_body_bigint for m in bmlt_meetings] == [1, 2]
+
+    bmlt_sb = BmltServiceBody(id=1, parent_id=0, name="sb name", type="AS")
+    bmlt_meetings = list(BmltMeeting.from_json(raw_meetings, [bmlt_sb]))
+    assert [m.service_body_bigint for m in bmlt_meetings] == [1]
+
+
 def test_save_meetings(db: Session, snapshot_1: Snapshot):
     db_sb_1 = crud.create_service_body(db, snapshot_1.id, 1, "sb name", "AS")
     db_format_1 = crud.create_format(db, snapshot_1.id, 1, "O")
@@ -1136,6 +1178,57 @@ def test_save_meetings(db: Session, snapshot_1: Snapshot):
     assert db_meeting.meeting_formats[1].format == db_format_2
 
 
+def test_save_meetings_batches(db: Session, snapshot_1: Snapshot):
+    db_sb_1 = crud.create_service_body(db, snapshot_1.id, 1, "sb name", "AS")
+    db_format_1 = crud.create_format(db, snapshot_1.id, 1, "O")
+    db_format_2 = crud.create_format(db, snapshot_1.id, 2, "BEG")
+
+    bmlt_meetings = []
+    for bmlt_id in range(1, 6):
+        bmlt_meeting = get_mock_bmlt_meeting()
+        bmlt_meeting.id_bigint = bmlt_id
+        bmlt_meeting.service_body_bigint = db_sb_1.bmlt_id
+        bmlt_meeting.format_shared_id_list = [1, 2, 3] if bmlt_id % 2 else [2]
+        bmlt_meetings.append(bmlt_meeting)
+
+    assert save_meetings(db, snapshot_1, bmlt_meetings, batch_size=2) == 5
+    db_meetings = db.query(Meeting).filter(Meeting.snapshot == snapshot_1).order_by(Meeting.bmlt_id).all()
+    assert [m.bmlt_id for m in db_meetings] == [1, 2, 3, 4, 5]
+    for db_meeting in db_meetings:
+        db_formats = sorted([mf.format for mf in db_meeting.meeting_formats], key=lambda f: f.bmlt_id)
+        if db_meeting.bmlt_id % 2:
+            assert db_formats == [db_format_1, db_format_2]
+        else:
+            assert db_formats == [db_format_2]
+
+
+def test_save_meetings_duplicate_bmlt_ids(db: Session, snapshot_1: Snapshot):
+    db_sb_1 = crud.create_service_body(db, snapshot_1.id, 1, "sb name", "AS")
+    crud.create_format(db, snapshot_1.id, 1, "O")
+    crud.create_format(db, snapshot_1.id, 2, "BEG")
+    crud.create_format(db, snapshot_1.id, 3, "C")
+
+    # every row the root server returns is kept, with its own formats, whether its duplicate is
+    # in the same batch or an earlier one
+    bmlt_meetings = []
+    for bmlt_id, name, format_ids in ((1, "first", [1]), (2, "other", [2]), (1, "second", [2]), (1, "third", [3])):
+        bmlt_meeting = get_mock_bmlt_meeting()
+        bmlt_meeting.id_bigint = bmlt_id
+        bmlt_meeting.meeting_name = name
+        bmlt_meeting.service_body_bigint = db_sb_1.bmlt_id
+        bmlt_meeting.format_shared_id_list = format_ids
+        bmlt_meetings.append(bmlt_meeting)
+
+    assert save_meetings(db, snapshot_1, bmlt_meetings, batch_size=3) == 4
+    db_meetings = db.query(Meeting).filter(Meeting.snapshot == snapshot_1).order_by(Meeting.id).all()
+    assert [(m.bmlt_id, m.name, [mf.format.bmlt_id for mf in m.meeting_formats]) for m in db_meetings] == [
+        (1, "first", [1]),
+        (2, "other", [2]),
+        (1, "second", [2]),
+        (1, "third", [3]),
+    ]
+
+
 def test_update_meetings_last_changed_meeting_created(db: Session, snapshot_1: Snapshot, snapshot_2: Snapshot, sb_1_snap_1: ServiceBody, sb_1_snap_2: ServiceBody):
     mtg_1_snap_2 = create_meeting(db, [], **get_meeting_kwargs(snapshot_2, sb_1_snap_2, 1))
 
@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+from datetime import timedelta
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from dijon import crud, models, snapshot
+from dijon.snapshot import export, serialize, structs
+from dijon.snapshot.cache import NawsCodeCache
+from dijon.snapshot.create import BmltFormat, BmltMeeting, BmltServiceBody, replace_meeting_events
+from dijon.utils import json_util
+from dijon.utils.http_util import JsonArrayStream
+
+
+def get_payloads() -> dict[str, list[dict[str, Any]]]:
+    service_bodies = [
+        {"id": "1", "parent_id": "0", "name": "sb 1", "type": "AS"},
+        {"id": "2", "parent_id": "1", "name": "sb 2", "type": "AS"},
+    ]
+    formats = [
+        {"id": "1", "key_string": "O", "name_string": "Open"},
+        {"id": "2", "key_string": "C", "name_string": "Closed"},
+    ]
+    meetings = [
+        {
+            "id_bigint": str(i),
+            "meeting_name": f"meeting {i}",
+            "weekday_tinyint": "2",
+            "service_body_bigint": str(i % 2 + 1),
+            "start_time": "19:00:00",
+            "duration_time": "01:00:00",
+            "format_shared_id_list": "1,2",
+            "published": "1",
+        }
+        for i in range(1, 6)
+    ]
+    return {
+        BmltServiceBody.get_url("https://blah/main_server/"): service_bodies,
+        BmltFormat.get_url("https://blah/main_server/"): formats,
+        BmltMeeting.get_url("https://blah/main_server/"): meetings,
+    }
+
+
+def mock_stream_json(payloads: dict[str, list[dict[str, Any]]]):
+    def stream_json(url: str) -> JsonArrayStream:
+        body = json.dumps(payloads[url]).encode("utf-8")
+        return JsonArrayStream(io.BytesIO(body), hashlib.sha256(body).hexdigest())
+    return patch("dijon.snapshot.create.stream_json", stream_json)
+
+
+@pytest.fixture
+def root_server(db: Session) -> models.RootServer:
+    return crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+
+
+def create_snapshot(db: Session, root_server: models.RootServer, payloads: dict[str, list[dict[str, Any]]]) -> models.Snapshot:
+    # move any existing snapshots back a day so the new one has a previous snapshot
+    for snap in crud.get_snapshots(db, root_server.id):
+        snap.created_at = snap.created_at - timedelta(days=1)
+        db.add(snap)
+    db.flush()
+
+    with mock_stream_json(payloads):
+        snapshot.create(db, root_server)
+    snap = crud.get_snapshots(db, root_server.id)[-1]
+    db.refresh(snap)
+    return snap
+
+
+def test_create_snapshot(db: Session, root_server: models.RootServer):
+    snap = create_snapshot(db, root_server, get_payloads())
+    assert snap.alias_of_id is None
+    assert snap.data_id == snap.id
+    assert snap.service_bodies_digest is not None
+    assert snap.formats_digest is not None
+    assert snap.meetings_digest is not None
+    assert len(crud.get_service_bodies_for_snapshot(db, snap.id)) == 2
+    assert len(crud.get_formats_for_snapshot(db, snap.id)) == 2
+    assert len(crud.get_meetings_for_snapshot(db, snap.id)) == 5
+
+
+def test_create_snapshot_unchanged(db: Session, root_server: models.RootServer):
+    snap_1 = create_snapshot(db, root_server, get_payloads())
+    snap_2 = create_snapshot(db, root_server, get_payloads())
+    snap_3 = create_snapshot(db, root_server, get_payloads())
+
+    # unchanged snapshots have no rows of their own, and always alias the snapshot with the data
+    assert snap_2.alias_of_id == snap_1.id
+    assert snap_3.alias_of_id == snap_1.id
+    assert len(crud.get_meetings_for_snapshot(db, snap_3.id)) == 0
+    assert len(snapshot.get_meetings(db, snap_3.id)) == 5
+    assert len(snapshot.get_formats(db, snap_3.id)) == 2
+    assert len(snapshot.get_service_bodies(db, snap_3.id)) == 2
+    assert snapshot.diff(db, snap_1.id, snap_3.id) == []
+
+
+def test_create_snapshot_changed(db: Session, root_server: models.RootServer):
+    snap_1 = create_snapshot(db, root_server, get_payloads())
+    snap_2 = create_snapshot(db, root_server, get_payloads())
+
+    payloads = get_payloads()
+    payloads[BmltMeeting.get_url(root_server.url)][0]["meeting_name"] = "updated"
+    snap_3 = create_snapshot(db, root_server, payloads)
+    assert snap_3.alias_of_id is None
+    assert len(crud.get_meetings_for_snapshot(db, snap_3.id)) == 5
+
+    events = snapshot.diff(db, snap_2.id, snap_3.id)
+    assert len(events) == 1
+    assert events[0].changed_fields == ["name"]
+
+    db_meetings = {m.bmlt_id: m for m in crud.get_meetings_for_snapshot(db, snap_3.id)}
+    assert db_meetings[1].last_changed == snap_3.created_at
+    assert snap_1.id == snap_2.alias_of_id
+
+
+def test_create_snapshot_meeting_events(db: Session, root_server: models.RootServer):
+    snap_1 = create_snapshot(db, root_server, get_payloads())
+    snap_2 = create_snapshot(db, root_server, get_payloads())
+
+    payloads = get_payloads()
+    meetings = payloads[BmltMeeting.get_url(root_server.url)]
+    meetings[0]["meeting_name"] = "updated"
+    meetings.pop()
+    snap_3 = create_snapshot(db, root_server, payloads)
+
+    payloads = get_payloads()
+    payloads[BmltMeeting.get_url(root_server.url)][1]["format_shared_id_list"] = "1"
+    snap_4 = create_snapshot(db, root_server, payloads)
+
+    assert snap_1.prev_snapshot_id is None
+    assert snap_2.prev_snapshot_id == snap_1.id
+    assert snap_3.prev_snapshot_id == snap_2.id
+    assert snap_4.prev_snapshot_id == snap_3.id
+
+    db_events = db.query(models.MeetingEvent).filter(models.MeetingEvent.snapshot_id == snap_3.id).order_by(models.MeetingEvent.bmlt_id).all()
+    assert [(e.bmlt_id, e.event_type, e.changed_fields) for e in db_events] == [(1, "MeetingUpdated", "name"), (5, "MeetingDeleted", "")]
+    assert crud.get_meeting_event_bmlt_ids(db, [snap_2.id]) == []
+
+    # composing the recorded events gives the same diff as comparing the snapshots
+    for old, new in [(snap_1, snap_4), (snap_2, snap_3), (snap_3, snap_4), (snap_1, snap_2)]:
+        expected = snapshot.diff(db, old.id, new.id, strategy="memory")
+        with patch("dijon.crud.get_changed_meeting_bmlt_ids", side_effect=AssertionError):
+            assert snapshot.diff(db, old.id, new.id, strategy="events") == expected
+    # the name change and deletion in snap_3 were reverted in snap_4
+    events = snapshot.diff(db, snap_1.id, snap_4.id, strategy="events")
+    assert [(e.new_meeting.bmlt_id, e.changed_fields) for e in events] == [(2, ["format_bmlt_ids"])]
+
+
+def test_create_snapshot_meeting_events_missing(db: Session, root_server: models.RootServer):
+    snap_1 = create_snapshot(db, root_server, get_payloads())
+    payloads = get_payloads()
+    payloads[BmltMeeting.get_url(root_server.url)][0]["meeting_name"] = "updated"
+    snap_2 = create_snapshot(db, root_server, payloads)
+
+    # without a recorded chain of events between the snapshots, the diff falls back to sql
+    snap_2.prev_snapshot_id = None
+    db.flush()
+    assert len(snapshot.diff(db, snap_1.id, snap_2.id, strategy="events")) == 1
+
+
+def test_replace_meeting_events(db: Session, root_server: models.RootServer):
+    snap_1 = create_snapshot(db, root_server, get_payloads())
+    payloads = get_payloads()
+    payloads[BmltMeeting.get_url(root_server.url)][0]["meeting_name"] = "updated"
+    snap_2 = create_snapshot(db, root_server, payloads)
+
+    # as if snap_2 was ingested before meeting events were recorded
+    crud.delete_meeting_events(db, snap_2.id)
+    snap_2.prev_snapshot_id = None
+    db.flush()
+
+    events = replace_meeting_events(db, snap_2, snap_1)
+    assert len(events) == 1
+    assert snap_2.prev_snapshot_id == snap_1.id
+    assert crud.get_meeting_event_bmlt_ids(db, [snap_2.id]) == [1]
+
+    # replacing is idempotent
+    replace_meeting_events(db, snap_2, snap_1)
+    assert crud.get_meeting_event_bmlt_ids(db, [snap_2.id]) == [1]
+    assert db.query(models.MeetingEvent).filter(models.MeetingEvent.snapshot_id == snap_2.id).count() == 1
+
+
+def test_create_snapshot_fetch_failure_closes_streams(db: Session, root_server: models.RootServer):
+    payloads = get_payloads()
+    streams = []
+
+    def stream_json(url: str) -> JsonArrayStream:
+        if url == BmltFormat.get_url(root_server.url):
+            raise Exception("Unexpected status code 500")
+        body = json.dumps(payloads[url]).encode("utf-8")
+        streams.append(JsonArrayStream(io.BytesIO(body), hashlib.sha256(body).hexdigest()))
+        return streams[-1]
+
+    with patch("dijon.snapshot.create.stream_json", stream_json):
+        with pytest.raises(Exception, match="500"):
+            snapshot.create(db, root_server)
+    assert len(streams) == 2
+    assert all(stream._fp.closed for stream in streams)
+
+
+@pytest.fixture
+def export_dir(tmp_path) -> str:
+    with patch("dijon.snapshot.export.get_export_dir", lambda: str(tmp_path)):
+        yield str(tmp_path)
+
+
+def test_create_snapshot_exports(db: Session, root_server: models.RootServer, export_dir: str):
+    snap = create_snapshot(db, root_server, get_payloads())
+    # exports are written once the snapshot is committed, not during ingest
+    assert not os.path.exists(os.path.join(export_dir, str(snap.id)))
+    # and the meetings are streamed to disk rather than loaded all at once
+    with patch("dijon.crud.get_meetings_for_snapshot") as get_meetings_for_snapshot:
+        export.write_exports(db, snap)
+    get_meetings_for_snapshot.assert_not_called()
+    # and no temporary files are left behind
+    names = (export.MEETINGS, export.FORMATS, export.SERVICE_BODIES)
+    expected = [os.path.basename(export.get_export_path(snap.id, name, gzipped=gzipped)) for name in names for gzipped in (False, True)]
+    assert sorted(os.listdir(os.path.join(export_dir, str(snap.id)))) == sorted(expected)
+    for name in (export.MEETINGS, export.FORMATS, export.SERVICE_BODIES):
+        with open(export.get_export_path(snap.id, name, gzipped=True), "rb") as f:
+            assert gzip.decompress(f.read()) == export.read_export(snap.id, name)
+
+    cache = NawsCodeCache(db, root_server)
+    assert export.get_meetings_json(db, snap, cache) == json_util.dumps(snapshot.get_meetings(db, snap.id))
+    assert export.get_formats_json(snap, cache) == json_util.dumps(snapshot.get_formats(db, snap.id))
+    assert export.get_service_bodies_json(snap, cache) == json_util.dumps(snapshot.get_service_bodies(db, snap.id))
+    assert export.get_servable_export_path(snap, cache, export.MEETINGS) == export.get_export_path(snap.id, export.MEETINGS, gzipped=True)
+
+    # an unchanged snapshot is an alias and reads its data's exports
+    alias = create_snapshot(db, root_server, get_payloads())
+    assert alias.alias_of_id == snap.id
+    export.write_exports(db, alias)
+    assert not os.path.exists(os.path.join(export_dir, str(alias.id)))
+    assert export.get_meetings_json(db, alias, cache) == export.read_export(snap.id, export.MEETINGS)
+
+    export.delete_exports(snap.id)
+    assert export.get_meetings_json(db, snap, cache) is None
+
+
+def test_create_snapshot_exports_naws_codes(db: Session, root_server: models.RootServer, export_dir: str):
+    snap = create_snapshot(db, root_server, get_payloads())
+    export.write_exports(db, snap)
+    crud.create_meeting_naws_code(db, root_server.id, 1, "M1")
+    crud.create_service_body_naws_code(db, root_server.id, 2, "S2")
+    crud.create_format_naws_code(db, root_server.id, 1, "F1")
+    db.refresh(root_server)
+
+    # the overrides are applied to the export, and the result matches the response built from the db
+    cache = NawsCodeCache(db, root_server)
+    assert export.get_servable_export_path(snap, cache, export.MEETINGS) is None
+    assert export.get_meetings_json(db, snap, cache) == json_util.dumps(snapshot.get_meetings(db, snap.id))
+    assert export.get_meetings_json(db, snap, cache, [2]) == json_util.dumps(snapshot.get_meetings(db, snap.id, [2]))
+    assert export.get_meetings_json(db, snap, cache, [1]) == json_util.dumps(snapshot.get_meetings(db, snap.id, [1]))
+    assert export.get_formats_json(snap, cache) == json_util.dumps(snapshot.get_formats(db, snap.id))
+    assert export.get_service_bodies_json(snap, cache) == json_util.dumps(snapshot.get_service_bodies(db, snap.id))
+
+
+def test_accepts_gzip():
+    assert export.accepts_gzip("gzip")
+    assert export.accepts_gzip("deflate, gzip;q=0.5")
+    assert export.accepts_gzip("*")
+    assert not export.accepts_gzip(None)
+    assert not export.accepts_gzip("deflate, br")
+    assert not export.accepts_gzip("gzip;q=0")
+
+
+def test_serialize_matches_structs(db: Session, root_server: models.RootServer):
+    payloads = get_payloads()
+    meetings = payloads[BmltMeeting.get_url("https://blah/main_server/")]
+    meetings[0].update({"latitude": "41.5", "longitude": "-82", "venue_type": "2", "time_zone": "America/New_York"})
+    meetings[1].update({"latitude": "0.000001", "longitude": "180.123456789012"})
+    snap = create_snapshot(db, root_server, payloads)
+    crud.create_meeting_naws_code(db, root_server.id, 1, "M1")
+    crud.create_service_body_naws_code(db, root_server.id, 1, "S1")
+    crud.create_format_naws_code(db, root_server.id, 2, "F2")
+    db.refresh(root_server)
+
+    cache = NawsCodeCache(db, root_server)
+    db_meetings = crud.get_meetings_for_snapshot(db, snap.id)
+    db_formats = crud.get_formats_for_snapshot(db, snap.id)
+    db_service_bodies = crud.get_service_bodies_for_snapshot(db, snap.id)
+    assert serialize.meeting_to_json(db_meetings[0], cache)["latitude"] == 41.5
+    assert json_util.render(serialize.meetings_to_json(db_meetings, cache)) == json_util.dumps(structs.Meeting.from_db_obj_list(db_meetings, cache))
+    assert json_util.render(serialize.formats_to_json(db_formats, cache)) == json_util.dumps(structs.Format.from_db_obj_list(db_formats, cache))
+    assert json_util.render(serialize.service_bodies_to_json(db_service_bodies, cache)) == json_util.dumps(structs.ServiceBody.from_db_obj_list(db_service_bodies, cache))
+
+
+def test_naws_code_cache_memoize(db: Session, root_server: models.RootServer):
+    snap = create_snapshot(db, root_server, get_payloads())
+    cache = NawsCodeCache(db, root_server)
+    meetings = structs.Meeting.from_db_obj_list(crud.get_meetings_for_snapshot(db, snap.id), cache)
+    # meetings 1, 3 and 5 are in service body 2, and every meeting has formats 1 and 2
+    assert meetings[0].service_body is meetings[2].service_body
+    assert meetings[0].formats[0] is meetings[1].formats[0]
+
+    # the built structs depend on the naws codes, so they are rebuilt once those are cleared
+    crud.create_service_body_naws_code(db, root_server.id, 2, "S2")
+    cache.clear()
+    meeting = structs.Meeting.from_db_obj(crud.get_meetings_for_snapshot(db, snap.id)[0], cache)
+    assert meeting.service_body is not meetings[0].service_body
+    assert meeting.service_body.naws_code_override == "S2"
@@ -0,0 +1,115 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+from dijon.snapshot import delete
+from dijon.snapshot.tests.test_compact import set_meeting_name
+from dijon.snapshot.tests.test_create_snapshot import create_snapshot, get_payloads
+
+
+@pytest.fixture
+def root_server(db: Session) -> models.RootServer:
+    return crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+
+
+def count_rows(db: Session, snapshot_ids: list[int]) -> dict[str, int]:
+    return {
+        "meetings": db.query(models.Meeting).filter(models.Meeting.snapshot_id.in_(snapshot_ids)).count(),
+        "meeting_formats": db.query(models.MeetingFormat).join(models.Meeting).filter(models.Meeting.snapshot_id.in_(snapshot_ids)).count(),
+        "service_bodies": db.query(models.ServiceBody).filter(models.ServiceBody.snapshot_id.in_(snapshot_ids)).count(),
+        "formats": db.query(models.Format).filter(models.Format.snapshot_id.in_(snapshot_ids)).count(),
+        "snapshots": db.query(models.Snapshot).filter(models.Snapshot.id.in_(snapshot_ids)).count(),
+    }
+
+
+def test_delete_snapshot(db: Session, root_server: models.RootServer):
+    payloads = get_payloads()
+    snap_1 = create_snapshot(db, root_server, payloads)
+    snap_2 = create_snapshot(db, root_server, set_meeting_name(payloads, 1, "renamed 1"))
+    before = count_rows(db, [snap_1.id])
+    other_before = count_rows(db, [snap_2.id])
+
+    progress = []
+    counts = delete.delete_snapshot(db, snap_1, batch_size=2, progress=lambda table, num_rows: progress.append((table, num_rows)))
+
+    assert {table: counts[table] for table in before} == before
+    assert count_rows(db, [snap_1.id]) == {table: 0 for table in before}
+    assert count_rows(db, [snap_2.id]) == other_before
+    # a batch at a time, and the totals add up
+    assert len([p for p in progress if p[0] == "meetings"]) == (before["meetings"] + 1) // 2
+    assert all(num_rows <= 2 for table, num_rows in progress if table != "meeting_formats")
+    totals = {}
+    for table, num_rows in progress:
+        totals[table] = totals.get(table, 0) + num_rows
+    assert totals == counts
+    assert [s.snapshot_id for s in crud.get_snapshot_dates(db, root_server.id)] == [snap_2.id]
+
+
+def test_delete_snapshot_unlinked_first(db: Session, root_server: models.RootServer):
+    payloads = get_payloads()
+    snap_1 = create_snapshot(db, root_server, payloads)
+    snap_2 = create_snapshot(db, root_server, set_meeting_name(payloads, 1, "renamed 1"))
+    # both on the same day
+    snap_1.created_at = snap_2.created_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    db.add(snap_1)
+    db.flush()
+    snapshot_date = snap_2.created_at.date()
+    assert crud.get_snapshot_by_date(db, root_server.id, snapshot_date) == snap_2
+    data_version = crud.get_cache_versions(db, root_server.id)[1]
+
+    # while the rows are going, the date already reads the previous snapshot of the day, and
+    # nothing cached from the snapshot can be served
+    seen = []
+
+    def progress(table: str, num_rows: int):
+        seen.append((crud.get_snapshot_by_date(db, root_server.id, snapshot_date), crud.get_cache_versions(db, root_server.id)[1]))
+
+    delete.delete_snapshot(db, snap_2, batch_size=2, progress=progress)
+
+    assert seen and all(seen_snapshot == snap_1 and seen_version == data_version + 1 for seen_snapshot, seen_version in seen)
+    assert crud.get_snapshot_by_date(db, root_server.id, snapshot_date) == snap_1
+
+
+def test_delete_root_server(db: Session, root_server: models.RootServer):
+    payloads = get_payloads()
+    snap_1 = create_snapshot(db, root_server, payloads)
+    snap_2 = create_snapshot(db, root_server, payloads)
+    assert snap_2.alias_of_id == snap_1.id
+    crud.create_format_naws_code(db, root_server.id, 1, "ABC")
+    other_root_server = crud.create_root_server(db, "other", "https://blah/main_server/", True)
+    other_snap = create_snapshot(db, other_root_server, get_payloads())
+    other_before = count_rows(db, [other_snap.id])
+
+    progress = []
+    counts = delete.delete_root_server(db, root_server, batch_size=2, progress=lambda table, num_rows: progress.append((table, num_rows)))
+
+    assert counts["snapshots"] == 2
+    assert counts["root_servers"] == 1
+    assert counts["meetings"] == other_before["meetings"]
+    assert count_rows(db, [snap_1.id, snap_2.id]) == {table: 0 for table in other_before}
+    assert crud.get_root_server(db, root_server.id) is None
+    assert crud.get_format_naws_codes(db, root_server.id) == []
+    assert crud.get_snapshot_dates(db, root_server.id) == []
+    assert count_rows(db, [other_snap.id]) == other_before
+    assert ("root_servers", 1) == progress[-1]
+
+
+def test_delete_marked_root_server(db: Session, root_server: models.RootServer):
+    snap = create_snapshot(db, root_server, get_payloads())
+    other_root_server = crud.create_root_server(db, "other", "https://blah/main_server/", True)
+
+    assert crud.mark_root_server_for_deletion(db, root_server.id)
+    assert not crud.mark_root_server_for_deletion(db, root_server.id)
+    # hidden until it is deleted
+    assert crud.get_root_server(db, root_server.id) is None
+    assert crud.get_root_servers(db) == [other_root_server]
+    assert crud.get_snapshot_by_date(db, root_server.id, snap.created_at.date()) is None
+    assert not crud.update_root_server(db, root_server.id, name="renamed")
+    assert crud.get_root_servers_marked_for_deletion(db) == [root_server]
+
+    counts = delete.delete_root_server(db, root_server, batch_size=2)
+
+    assert counts["snapshots"] == 1
+    assert crud.get_root_server(db, root_server.id, include_marked=True) is None
+    assert crud.get_root_servers_marked_for_deletion(db) == []
+    assert crud.get_root_servers(db) == [other_root_server]
@@ -1,6 +1,7 @@
 from datetime import time, timedelta
 from decimal import Decimal
 from typing import Any
+from unittest.mock import patch
 
 import pytest
 from sqlalchemy.orm import Session
@@ -8,7 +9,7 @@ from sqlalchemy.orm import Session
 from dijon import crud, models
 from dijon.snapshot import structs
 from dijon.snapshot.cache import NawsCodeCache
-from dijon.snapshot.diff import Data, diff_snapshots
+from dijon.snapshot.diff import Data, DiffStrategy, diff_snapshots
 
 
 def create_root_server(db: Session) -> models.RootServer:
@@ -156,11 +157,65 @@ def test_diff_sb_filter(db: Session, mtg_1_snap_1, mtg_1_snap_2, mtg_2_snap_2):
     assert len(events) == 0
 
 
+@pytest.mark.parametrize("strategy", list(DiffStrategy))
+def test_diff_strategy_no_changes(db: Session, mtg_1_snap_1, mtg_2_snap_1, mtg_1_snap_2, mtg_2_snap_2, strategy):
+    events = diff_snapshots(db, mtg_1_snap_1.snapshot_id, mtg_1_snap_2.snapshot_id, strategy=strategy)
+    assert events == []
+
+
+@pytest.mark.parametrize("strategy", list(DiffStrategy))
+def test_diff_strategy(db: Session, mtg_1_snap_1, mtg_2_snap_1, mtg_1_snap_2, sb_1_snap_2, fmt_123_snap_2, strategy):
+    mtg_1_snap_2.latitude = None
+    db.flush()
+    create_meeting(db, [fmt_123_snap_2], **get_meeting_kwargs(mtg_1_snap_2.snapshot, sb_1_snap_2, 3))
+
+    events = diff_snapshots(db, mtg_1_snap_1.snapshot_id, mtg_1_snap_2.snapshot_id, strategy=strategy)
+    assert [(e.event_type, (e.new_meeting or e.old_meeting).bmlt_id) for e in events] == [
+        (structs.MeetingEventType.MEETING_CREATED, 3),
+        (structs.MeetingEventType.MEETING_UPDATED, 1),
+        (structs.MeetingEventType.MEETING_DELETED, 2),
+    ]
+    assert events[1].changed_fields == ["latitude"]
+
+
+@pytest.mark.parametrize("strategy", list(DiffStrategy))
+def test_diff_strategy_format_changed(db: Session, mtg_1_snap_1, mtg_1_snap_2, snap_2, strategy):
+    fmt = create_format(db, snap_2, 456, "BB", "B B")
+    db.add(models.MeetingFormat(meeting=mtg_1_snap_2, format=fmt))
+    db.flush()
+
+    events = diff_snapshots(db, mtg_1_snap_1.snapshot_id, mtg_1_snap_2.snapshot_id, strategy=strategy)
+    assert len(events) == 1
+    assert events[0].changed_fields == ["format_bmlt_ids"]
+
+
+@pytest.mark.parametrize("strategy", list(DiffStrategy))
+def test_diff_strategy_service_body_changed(db: Session, mtg_1_snap_1, mtg_1_snap_2, sb_2_snap_2, strategy):
+    mtg_1_snap_2.service_body_id = sb_2_snap_2.id
+    db.flush()
+
+    events = diff_snapshots(db, mtg_1_snap_1.snapshot_id, mtg_1_snap_2.snapshot_id, strategy=strategy)
+    assert len(events) == 1
+    assert events[0].changed_fields == ["service_body_bmlt_id"]
+
+    # moved into the filtered service body, so it looks created
+    events = diff_snapshots(db, mtg_1_snap_1.snapshot_id, mtg_1_snap_2.snapshot_id, service_body_bmlt_ids=[2], strategy=strategy)
+    assert [e.event_type for e in events] == [structs.MeetingEventType.MEETING_CREATED]
+
+
 def test_diff_no_changes(mtg_1_snap_1, mtg_1_snap_2, cache):
     data = Data([mtg_1_snap_1], [mtg_1_snap_2], cache)
     assert data.diff() == []
 
 
+def test_diff_no_changes_skips_validation(mtg_1_snap_1, mtg_1_snap_2, cache):
+    # identical fingerprints never build the DiffableMeeting structs
+    with patch.object(structs.DiffableMeeting, "from_db_obj") as from_db_obj:
+        data = Data([mtg_1_snap_1], [mtg_1_snap_2], cache)
+        assert data.diff() == []
+    from_db_obj.assert_not_called()
+
+
 def test_diff_meeting_sb_filter(mtg_1_snap_1, mtg_1_snap_2, mtg_2_snap_2, cache):
     data = Data([mtg_1_snap_1], [mtg_1_snap_2, mtg_2_snap_2], cache)
     events = data.diff()
@@ -533,7 +588,13 @@ def test_snapshot_struct_format_naws_code(db: Session, fmt_123_snap_1: models.Fo
     assert fmt.naws_code_override is None
 
 
-def test_get_child_service_body_bmlt_ids(db: Session, snap_1: models.Snapshot):
+@pytest.fixture(params=[True, False], ids=["cte", "in_memory"])
+def recursive_cte(request) -> bool:
+    with patch("dijon.crud._supports_recursive_cte", lambda db: request.param):
+        yield request.param
+
+
+def test_get_child_service_body_bmlt_ids(db: Session, snap_1: models.Snapshot, recursive_cte: bool):
     sb_1 = create_service_body(db, snap_1.id, 1)
     sb_1_1 = create_service_body(db, snap_1.id, 2, sb_1.id)
     sb_1_1_1 = create_service_body(db, snap_1.id, 3, sb_1_1.id)
@@ -557,7 +618,18 @@ def test_get_child_service_body_bmlt_ids(db: Session, snap_1: models.Snapshot):
     assert sorted(child_bmlt_ids) == sorted([sb_2.bmlt_id])
 
 
-def test_get_child_service_body_bmlt_ids_circular(db: Session, snap_1: models.Snapshot):
+def test_get_child_service_body_bmlt_ids_deep(db: Session, snap_1: models.Snapshot, recursive_cte: bool):
+    parent_id = None
+    for bmlt_id in range(1, 101):
+        parent_id = create_service_body(db, snap_1.id, bmlt_id, parent_id).id
+    create_service_body(db, snap_1.id, 101)
+
+    assert crud.get_child_service_body_bmlt_ids(db, snap_1.id, [1]) == list(range(1, 101))
+    assert crud.get_child_service_body_bmlt_ids(db, snap_1.id, [100, 50]) == [100, 50] + list(range(51, 100))
+    assert crud.get_child_service_body_bmlt_ids(db, snap_1.id, [1234]) == [1234]
+
+
+def test_get_child_service_body_bmlt_ids_circular(db: Session, snap_1: models.Snapshot, recursive_cte: bool):
     sb_1 = create_service_body(db, snap_1.id, 1)
     sb_2 = create_service_body(db, snap_1.id, 5, sb_1.id)
     sb_1.parent_id = sb_2.id
@@ -0,0 +1,31 @@
+from sqlalchemy.orm import Session
+
+from dijon import crud, snapshot
+
+
+def test_cache_versions(db: Session):
+    rs_1 = crud.create_root_server(db, "root 1", "https://1/main_server/", True)
+    rs_2 = crud.create_root_server(db, "root 2", "https://2/main_server/", True)
+    assert crud.get_cache_versions(db, rs_1.id) == (0, 0)
+
+    crud.create_meeting_naws_code(db, rs_1.id, 1, "G123")
+    crud.update_meeting_naws_code(db, rs_1.id, 1, "G456")
+    assert crud.get_cache_versions(db, rs_1.id) == (2, 0)
+
+    crud.increment_data_version(db, [rs_1.id, rs_2.id])
+    assert crud.get_cache_versions(db, rs_1.id) == (2, 1)
+    assert crud.get_cache_versions(db, rs_2.id) == (0, 1)
+
+    # the root server's row is never written, so ingest's foreign key locks on it don't block this
+    assert not db.dirty
+
+
+def test_cache_versions_keys(db: Session):
+    rs = crud.create_root_server(db, "root 1", "https://1/main_server/", True)
+    snap = crud.create_snapshot(db, rs)
+    keys = [snapshot.get_meetings_key(db, snap), snapshot.get_formats_key(db, snap), snapshot.get_service_bodies_key(db, snap)]
+
+    # rewriting the snapshot data, as populate-meeting-last-changed does, changes every key
+    crud.increment_data_version(db, [rs.id])
+    new_keys = [snapshot.get_meetings_key(db, snap), snapshot.get_formats_key(db, snap), snapshot.get_service_bodies_key(db, snap)]
+    assert all(key != new_key for key, new_key in zip(keys, new_keys))
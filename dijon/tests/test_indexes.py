@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from dijon import crud, models
+
+
+def assert_index_used(db: Session, fn: Callable, index: str):
+    # runs fn, then explains every statement it executed and checks one of them looks rows up through index
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    conn = db.connection()
+    plans = []
+    for statement, parameters in statements:
+        plans.extend(conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings().all())
+    assert any(row["key"] == index and row["type"] != "ALL" for row in plans), plans
+
+
+@pytest.fixture
+def snap(db: Session) -> models.Snapshot:
+    root_server = crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+    snap = crud.create_snapshot(db, root_server)
+    sb = crud.create_service_body(db, snap.id, 1, "sb", "AS")
+    crud.create_format(db, snap.id, 1, "O", "Open")
+    db.add(models.Meeting(
+        snapshot_id=snap.id, bmlt_id=1, name="meeting", day=models.DayOfWeekEnum.MONDAY, service_body_id=sb.id,
+        venue_type=models.VenueTypeEnum.IN_PERSON, start_time=datetime.now().time(), duration=timedelta(hours=1), published=True,
+    ))
+    db.flush()
+    return snap
+
+
+def test_snapshot_by_date_index(db: Session, snap: models.Snapshot):
+    # dates are resolved through snapshot_dates' primary key
+    assert_index_used(db, lambda: crud.get_snapshot_by_date(db, snap.root_server_id, date.today()), "PRIMARY")
+
+    index = "ix_snapshots_root_server_id_created_at"
+    assert_index_used(db, lambda: crud.refresh_snapshot_dates(db.connection(), [(snap.root_server_id, date.today())]), index)
+    assert_index_used(db, lambda: crud.get_previous_snapshot(db, snap.id), index)
+    assert_index_used(db, lambda: crud.get_snapshots_between(db, snap.root_server_id, datetime.now() - timedelta(days=1), datetime.now()), index)
+
+
+def test_format_bmlt_id_index(db: Session, snap: models.Snapshot):
+    assert_index_used(db, lambda: crud.get_formats_by_bmlt_ids(db, snap.id, [1, 2]), "ix_formats_snapshot_id_bmlt_id")
+
+
+def test_service_body_bmlt_id_index(db: Session, snap: models.Snapshot):
+    assert_index_used(db, lambda: crud.get_child_service_body_bmlt_ids(db, snap.id, [1]), "ix_service_bodies_snapshot_id_bmlt_id")
+
+
+def test_meeting_bmlt_id_index(db: Session, snap: models.Snapshot):
+    index = "ix_meetings_snapshot_id_bmlt_id"
+    assert_index_used(db, lambda: crud.get_meetings_for_snapshot(db, snap.id, bmlt_ids=[1]), index)
+    assert_index_used(db, lambda: crud.get_changed_meeting_bmlt_ids(db, snap.id, snap.id), index)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from dijon import crud, database, models
+
+
+def get_snapshot_dates(db: Session, root_server: models.RootServer) -> dict:
+    return {sd.snapshot_date: sd.snapshot_id for sd in crud.get_snapshot_dates(db, root_server.id)}
+
+
+def test_snapshot_dates(db: Session):
+    root_server = crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+    snap_1 = crud.create_snapshot(db, root_server)
+    snap_2 = crud.create_snapshot(db, root_server)
+    snap_3 = crud.create_snapshot(db, root_server)
+    today = snap_3.created_at.date()
+    yesterday = today - timedelta(days=1)
+
+    # the latest snapshot of the day is served for it
+    assert get_snapshot_dates(db, root_server) == {today: snap_3.id}
+    assert crud.get_snapshot_by_date(db, root_server.id, today) == snap_3
+
+    # moving a snapshot to another day updates both days
+    snap_3.created_at = snap_3.created_at - timedelta(days=1)
+    db.add(snap_3)
+    db.flush()
+    assert get_snapshot_dates(db, root_server) == {yesterday: snap_3.id, today: snap_2.id}
+    assert crud.get_snapshot_by_date(db, root_server.id, yesterday) == snap_3
+
+    # and deleting one falls back to the day's next latest snapshot
+    db.delete(snap_2)
+    db.flush()
+    assert get_snapshot_dates(db, root_server) == {yesterday: snap_3.id, today: snap_1.id}
+    db.delete(snap_1)
+    db.flush()
+    assert get_snapshot_dates(db, root_server) == {yesterday: snap_3.id}
+    assert crud.get_snapshot_by_date(db, root_server.id, today) is None
+
+    crud.refresh_snapshot_dates(db.connection(), [(root_server.id, yesterday), (root_server.id, today)])
+    assert get_snapshot_dates(db, root_server) == {yesterday: snap_3.id}
+
+
+def test_snapshot_dates_refresh_is_upsert(db: Session):
+    root_server = crud.create_root_server(db, "root name", "https://blah/main_server/", True)
+    snap_1 = crud.create_snapshot(db, root_server)
+    today = snap_1.created_at.date()
+
+    # refreshing a date that already has a row updates it in place
+    # a snapshot inserted behind the session's back, as another ingest's would be
+    db.execute(insert(models.Snapshot.__table__).values(root_server_id=root_server.id, created_at=snap_1.created_at + timedelta(seconds=1)))
+    crud.refresh_snapshot_dates(db.connection(), [(root_server.id, today)])
+    crud.refresh_snapshot_dates(db.connection(), [(root_server.id, today)])
+    assert get_snapshot_dates(db, root_server) == {today: crud.get_snapshots(db, root_server.id)[-1].id}
+
+
+def test_snapshot_dates_listener_scope():
+    # kept up to date by the app's sessions, not by every session of every importer of crud
+    assert event.contains(database.SessionLocal, "after_flush", database._refresh_snapshot_dates_after_flush)
+    assert not event.contains(Session, "after_flush", database._refresh_snapshot_dates_after_flush)
+    assert not event.contains(Session, "after_flush", crud.refresh_snapshot_dates_after_flush)
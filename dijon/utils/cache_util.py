@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from dijon.settings import settings
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache of bytes, bounded by entry count and total size.
+
+    Values larger than max_bytes are never stored.
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._num_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old_value = self._entries.pop(key, None)
+            if old_value is not None:
+                self._num_bytes -= len(old_value)
+            self._entries[key] = value
+            self._num_bytes += len(value)
+            while len(self._entries) > self.max_entries or self._num_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._num_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._num_bytes = 0
+
+    @property
+    def num_bytes(self) -> int:
+        return self._num_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Serialized snapshot responses. Entries go stale when a root server's NAWS codes change or its
+# snapshot data is rewritten, and both of its cache versions are part of the key.
+response_cache = LRUCache(
+    max_entries=settings.get("RESPONSE_CACHE_MAX_ENTRIES", 256),
+    max_bytes=settings.get("RESPONSE_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+)
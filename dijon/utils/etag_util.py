@@ -0,0 +1,30 @@
+import hashlib
+from typing import Any, Optional
+
+
+# bump this whenever the rendering of a response changes, so clients don't keep stale copies
+ETAG_VERSION = 1
+
+
+def get_etag(*parts: Any) -> str:
+    # a strong etag for a response that is entirely determined by parts. A strong etag identifies
+    # the exact bytes, so each content-coding of a response needs its own, e.g. with "gzip" as
+    # the last part.
+    value = repr((ETAG_VERSION,) + parts).encode("utf-8")
+    return f'"{hashlib.sha256(value).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> Optional[str]:
+    # the first of etags, each a representation of the same response, that If-None-Match matches.
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if not if_none_match:
+        return None
+    for value in if_none_match.split(","):
+        value = value.strip()
+        if value == "*":
+            return etags[0]
+        if value.startswith("W/"):
+            value = value[2:]
+        if value in etags:
+            return value
+    return None
@@ -0,0 +1,218 @@
+import codecs
+import hashlib
+import json
+import logging
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, suppress
+from typing import Any, BinaryIO, Iterator, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+from dijon.settings import settings
+
+
+logger = logging.getLogger(__name__)
+
+# This is just a random user agent that doesn't seem to get blocked by webhosts
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0 +dijon"
+
+
+class RequestMetric(NamedTuple):
+    url: str
+    status_code: Optional[int]
+    elapsed: float
+    num_bytes: int
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_metrics: deque[RequestMetric] = deque(maxlen=1000)
+_WHITESPACE = re.compile(r"\s*")
+
+
+def get_session() -> requests.Session:
+    # A single session is shared by every fetch so that connections (and their TLS
+    # handshakes) are kept alive and reused per host across switcher calls.
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+
+def _create_session() -> requests.Session:
+    retry = Retry(
+        total=settings.get("HTTP_RETRIES", 3),
+        backoff_factor=settings.get("HTTP_RETRY_BACKOFF_FACTOR", 1.0),
+        status_forcelist=[429, 500, 502, 503, 504],
+        # a server that timed out sending its response is likely to do so again
+        read=0,
+        allowed_methods=["GET"],
+        raise_on_status=False,
+    )
+    pool_size = settings.get("HTTP_POOL_SIZE", 10)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # urllib3 only advertises encodings it is able to decode, i.e. br when brotli is installed
+    session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+    return session
+
+
+def get_timeout() -> tuple[float, float]:
+    return settings.get("HTTP_CONNECT_TIMEOUT", 10.0), settings.get("HTTP_READ_TIMEOUT", 60.0)
+
+
+def get_deadline() -> float:
+    return settings.get("HTTP_DEADLINE", 600.0)
+
+
+def get_metrics() -> list[RequestMetric]:
+    return list(_metrics)
+
+
+def _record_metric(url: str, status_code: Optional[int], start: float, num_bytes: int):
+    metric = RequestMetric(url=url, status_code=status_code, elapsed=time.monotonic() - start, num_bytes=num_bytes)
+    _metrics.append(metric)
+    logger.info(f"GET {url} {status_code} {num_bytes} bytes in {metric.elapsed:.2f}s")
+
+
+class JsonArrayStream:
+    """The body of a JSON array response, spooled to a temporary file as it is received.
+
+    Iterating yields the array's items one at a time, so the whole document is never
+    held in memory as text or as parsed objects. The digest is the SHA-256 of the body.
+    """
+    def __init__(self, fp: BinaryIO, digest: str, chunk_size: int = 64 * 1024):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self.digest = digest
+
+    def __iter__(self) -> Iterator[Any]:
+        self._fp.seek(0)
+        return iter_json_array(self._fp, chunk_size=self._chunk_size)
+
+    def __enter__(self) -> "JsonArrayStream":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._fp.close()
+
+
+def stream_json(url: str, chunk_size: int = 64 * 1024) -> JsonArrayStream:
+    # The body is downloaded in full before it is parsed so that the connection goes
+    # back to the pool straight away instead of being held open while we write to the db.
+    start = time.monotonic()
+    deadline = get_deadline()
+    num_bytes = 0
+    status_code = None
+    digest = hashlib.sha256()
+    fp = tempfile.SpooledTemporaryFile(max_size=settings.get("HTTP_SPOOL_MAX_MEMORY", 8 * 1024 * 1024))
+    try:
+        with get_session().get(url, timeout=get_timeout(), stream=True) as response:
+            status_code = response.status_code
+            if response.status_code != 200:
+                raise Exception(f"Unexpected status code {response.status_code} GET {url}")
+            with _abort_after(response, start + deadline - time.monotonic()) as expired:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    fp.write(chunk)
+                    digest.update(chunk)
+                    num_bytes += len(chunk)
+            if expired.is_set():
+                raise Exception(f"GET {url} did not finish within {deadline}s")
+    except:  # noqa: E722
+        fp.close()
+        raise
+    finally:
+        _record_metric(url, status_code, start, num_bytes)
+    return JsonArrayStream(fp, digest.hexdigest(), chunk_size=chunk_size)
+
+
+@contextmanager
+def _abort_after(response: requests.Response, seconds: float) -> Iterator[threading.Event]:
+    # The read timeout only bounds each read from the socket, so a server that trickles its
+    # body out a few bytes at a time could hold a fetch open forever. Once the time is up the
+    # connection is shut down, which ends the read in progress, and the event is set.
+    expired = threading.Event()
+
+    def abort():
+        expired.set()
+        # the connection is released back to the pool once the body has been read
+        sock = getattr(response.raw.connection, "sock", None)
+        if sock is not None:
+            # it may have been closed in the meantime
+            with suppress(OSError):
+                sock.shutdown(socket.SHUT_RDWR)
+
+    timer = threading.Timer(max(seconds, 0), abort)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield expired
+    except requests.RequestException:
+        if not expired.is_set():
+            raise
+    finally:
+        timer.cancel()
+
+
+def iter_json_array(fp: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    reader = codecs.getreader("utf-8-sig")(fp)
+    buffer = ""
+    pos = 0
+    eof = False
+    expect = "["
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            buffer, pos, eof = _read_more(reader, buffer, pos, chunk_size)
+            continue
+
+        if expect == "[":
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            expect = "value or ]"
+        elif expect == ", or ]" or (expect == "value or ]" and buffer[pos] == "]"):
+            if buffer[pos] == "]":
+                return
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' at position {pos}")
+            pos += 1
+            expect = "value"
+        else:
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer, pos, eof = _read_more(reader, buffer, pos, chunk_size)
+                continue
+            if end == len(buffer) and not eof and not isinstance(obj, (dict, list, str)):
+                # a number or literal running to the end of the buffer may have been cut short
+                buffer, pos, eof = _read_more(reader, buffer, pos, chunk_size)
+                continue
+            pos = end
+            expect = ", or ]"
+            yield obj
+
+
+def _read_more(reader, buffer: str, pos: int, chunk_size: int) -> tuple[str, int, bool]:
+    chunk = reader.read(chunk_size)
+    return buffer[pos:] + chunk, 0, not chunk
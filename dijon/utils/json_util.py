@@ -0,0 +1,37 @@
+import dataclasses
+import json
+from typing import Any, Iterable, Iterator
+
+from fastapi.encoders import jsonable_encoder
+
+
+def dumps(content: Any) -> bytes:
+    # the same bytes a route would render for content returned through its response_model
+    return render(jsonable_encoder(_to_builtins(content)))
+
+
+def render(content: Any) -> bytes:
+    # content must already be plain json types, this is what JSONResponse does with them
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def iter_render(items: Iterable[Any]) -> Iterator[bytes]:
+    # the same bytes as render(list(items)), a piece at a time
+    yield b"["
+    for i, item in enumerate(items):
+        if i:
+            yield b","
+        yield render(item)
+    yield b"]"
+
+
+def _to_builtins(content: Any) -> Any:
+    # jsonable_encoder returns dataclasses.asdict() of a dataclass without encoding its values,
+    # whereas a response_model encodes every field, so the dataclasses are converted first
+    if dataclasses.is_dataclass(content):
+        return dataclasses.asdict(content)
+    if isinstance(content, list):
+        return [_to_builtins(item) for item in content]
+    if isinstance(content, dict):
+        return {key: _to_builtins(value) for key, value in content.items()}
+    return content
@@ -0,0 +1,40 @@
+from typing import Any, Callable, Optional
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from dijon.snapshot import export
+from dijon.utils import etag_util
+
+
+def json_export_response(
+    key: tuple[Any, ...],
+    if_none_match: Optional[str],
+    accept_encoding: Optional[str],
+    get_export_path: Callable[[], Optional[str]],
+    get_json: Callable[[], bytes],
+) -> Response:
+    # The response for a snapshot read whose content is entirely determined by key. Each
+    # content-coding has its own strong etag, either of which revalidates. When the client accepts
+    # gzip and get_export_path returns a gzipped export, that is sent as is, otherwise the json
+    # from get_json is.
+    etag = etag_util.get_etag(*key)
+    gzip_etag = etag_util.get_etag(*key, "gzip")
+    headers = {"Vary": "Accept-Encoding"}
+    matched_etag = etag_util.etag_matches(if_none_match, etag, gzip_etag)
+    if matched_etag:
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=dict(headers, ETag=matched_etag))
+
+    if export.accepts_gzip(accept_encoding):
+        path = get_export_path()
+        export_file = export.open_export(path) if path else None
+        if export_file:
+            # streamed with only our own headers: the file's mtime changes whenever the export is
+            # rewritten, so it would make a misleading Last-Modified
+            chunks, size = export_file
+            gzip_headers = {"ETag": gzip_etag, "Content-Encoding": "gzip", "Content-Length": str(size)}
+            return StreamingResponse(chunks, media_type="application/json", headers=dict(headers, **gzip_headers))
+
+    # the routes' response_model still documents them, the rendered bytes skip its validation
+    return Response(content=get_json(), media_type="application/json", headers=dict(headers, ETag=etag))
@@ -0,0 +1,43 @@
+from dijon.utils.cache_util import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(max_entries=2, max_bytes=100)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+
+    # b is the least recently used
+    cache.set("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert len(cache) == 2
+
+
+def test_lru_cache_max_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    assert cache.num_bytes == 10
+
+    cache.set("c", b"1")
+    assert cache.get("a") is None
+    assert cache.num_bytes == 6
+
+    # too big to ever be cached
+    cache.set("d", b"12345678901")
+    assert cache.get("d") is None
+    assert cache.get("b") == b"12345"
+
+
+def test_lru_cache_replace():
+    cache = LRUCache(max_entries=10, max_bytes=10)
+    cache.set("a", b"12345")
+    cache.set("a", b"12")
+    assert cache.get("a") == b"12"
+    assert cache.num_bytes == 2
+
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.num_bytes == 0
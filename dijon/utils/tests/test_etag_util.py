@@ -0,0 +1,31 @@
+from dijon.utils.etag_util import etag_matches, get_etag
+
+
+def test_get_etag():
+    etag = get_etag("meetings", 1, 0, None)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == get_etag("meetings", 1, 0, None)
+    assert etag != get_etag("meetings", 1, 1, None)
+    assert etag != get_etag("meetings", 1, 0, (1, 2))
+    assert etag != get_etag("formats", 1, 0, None)
+
+
+def test_etag_matches():
+    etag = get_etag("meetings", 1)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"abc", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+    assert not etag_matches('"abc"', etag)
+
+
+def test_etag_matches_codings():
+    etag = get_etag("meetings", 1)
+    gzip_etag = get_etag("meetings", 1, "gzip")
+    assert etag != gzip_etag
+    assert etag_matches(gzip_etag, etag, gzip_etag) == gzip_etag
+    assert etag_matches(f'"abc", {etag}', etag, gzip_etag) == etag
+    assert etag_matches("*", etag, gzip_etag) == etag
+    assert etag_matches(gzip_etag, etag) is None
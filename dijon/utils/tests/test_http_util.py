@@ -0,0 +1,100 @@
+import io
+import json
+import socket
+import threading
+import time
+from contextlib import suppress
+from typing import Callable
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from dijon.utils.http_util import iter_json_array, stream_json
+
+
+def get_fp(value) -> io.BytesIO:
+    return io.BytesIO(json.dumps(value, indent=2).encode("utf-8"))
+
+
+def test_iter_json_array():
+    items = [{"id": i, "name": f"meeting {i}", "list": [1, 2, "3"]} for i in range(100)]
+    assert list(iter_json_array(get_fp(items))) == items
+
+
+def test_iter_json_array_small_chunks():
+    items = [{"id": i, "name": "café ☕"} for i in range(10)] + [12345, "abc", None, True]
+    assert list(iter_json_array(get_fp(items), chunk_size=3)) == items
+
+
+def test_iter_json_array_bom():
+    # some root servers prefix their responses with a UTF-8 byte order mark
+    items = [{"id": 1, "name": "café"}, {"id": 2}]
+    fp = io.BytesIO(b"\xef\xbb\xbf" + get_fp(items).getvalue())
+    assert list(iter_json_array(fp)) == items
+    fp.seek(0)
+    assert list(iter_json_array(fp, chunk_size=1)) == items
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(io.BytesIO(b"[]"))) == []
+    assert list(iter_json_array(io.BytesIO(b" [ \n ] "))) == []
+
+
+def test_iter_json_array_invalid():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b"{}")))
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"id": 1}')))
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"id": 1} {"id": 2}]')))
+
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"id": 1},]')))
+
+
+def serve(respond: Callable[[socket.socket], None]) -> tuple[str, list[socket.socket]]:
+    # a server on a local port that hands each connection to respond, returning its url and connections
+    server = socket.create_server(("127.0.0.1", 0))
+    connections = []
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            connections.append(conn)
+            conn.recv(64 * 1024)
+            threading.Thread(target=respond, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return f"http://127.0.0.1:{server.getsockname()[1]}/", connections
+
+
+def test_stream_json_hung_server():
+    # never responds, which is abandoned after one read timeout instead of being retried
+    url, connections = serve(lambda conn: None)
+    start = time.monotonic()
+    with patch("dijon.utils.http_util.get_timeout", return_value=(1.0, 0.5)):
+        with pytest.raises(requests.RequestException):
+            stream_json(url)
+    assert time.monotonic() - start < 2
+    assert len(connections) == 1
+
+
+def test_stream_json_deadline():
+    # sends a byte of its body at a time, each well within the read timeout
+    def respond(conn: socket.socket):
+        conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 1000\r\n\r\n")
+        with suppress(OSError):
+            for _ in range(100):
+                conn.sendall(b" ")
+                time.sleep(0.05)
+
+    url, connections = serve(respond)
+    start = time.monotonic()
+    with patch("dijon.utils.http_util.get_timeout", return_value=(1.0, 1.0)):
+        with patch("dijon.utils.http_util.get_deadline", return_value=0.5):
+            with pytest.raises(Exception, match="did not finish within 0.5s"):
+                stream_json(url)
+    assert time.monotonic() - start < 2
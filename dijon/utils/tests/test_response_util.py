@@ -0,0 +1,41 @@
+import gzip
+
+from dijon.utils.etag_util import get_etag
+from dijon.utils.response_util import json_export_response
+
+
+def get_response(tmp_path, if_none_match=None, accept_encoding=None, exported=True):
+    path = tmp_path / "formats.json.gz"
+    path.write_bytes(gzip.compress(b"[1]"))
+    return json_export_response(
+        ("key",),
+        if_none_match,
+        accept_encoding,
+        lambda: str(path) if exported else None,
+        lambda: b"[1]",
+    )
+
+
+def test_json_export_response(tmp_path):
+    etag = get_etag("key")
+    gzip_etag = get_etag("key", "gzip")
+
+    response = get_response(tmp_path)
+    assert response.body == b"[1]"
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response = get_response(tmp_path, accept_encoding="gzip")
+    assert response.headers["etag"] == gzip_etag
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(len(gzip.compress(b"[1]")))
+    assert "last-modified" not in response.headers
+
+    response = get_response(tmp_path, accept_encoding="gzip", exported=False)
+    assert response.body == b"[1]"
+    assert response.headers["etag"] == etag
+
+    for if_none_match in (etag, gzip_etag):
+        response = get_response(tmp_path, if_none_match=if_none_match)
+        assert response.status_code == 304
+        assert response.headers["etag"] == if_none_match